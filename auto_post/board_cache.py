@@ -0,0 +1,104 @@
+"""Persistent on-disk cache of rasterized board images.
+
+The same positions come back across runs (re-posted puzzles, the marathon
+pulling the same popular puzzles per theme), so renderer.get_board_layer()
+checks here before going through chess.svg + cairosvg. Entries are PNGs
+keyed by everything that changes the picture; the directory is capped at
+CACHE_MAX_BYTES and trimmed least-recently-used first (hits bump mtime).
+"""
+import os
+import hashlib
+import threading
+
+# --- CONFIGURATION ---
+CACHE_DIR = "board_cache"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+EVICT_TO_FRACTION = 0.8    # trim down to this share of the cap when over it
+
+_total_bytes = None
+# Render workers store from several threads; guards _total_bytes and eviction
+_lock = threading.RLock()
+
+
+def cache_key(fen, last_move, orientation, size, style_version):
+    """Hash of what affects the image; FEN move counters are ignored"""
+    placement_and_turn = " ".join(fen.split()[:2])
+    raw = f"{placement_and_turn}|{last_move or '-'}|{orientation}|{size}|{style_version}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.png")
+
+
+def load(key):
+    """Cached image or None; a hit marks the entry as recently used"""
+    from PIL import Image
+
+    path = _path(key)
+    try:
+        with Image.open(path) as im:
+            im.load()
+            image = im.convert("RGB")
+        os.utime(path)
+        return image
+    except (OSError, ValueError):
+        return None
+
+
+def store(key, image):
+    global _total_bytes
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        image.save(tmp, format="PNG", compress_level=3)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Board cache write failed: {e}")
+        return
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = _scan_size()
+        else:
+            _total_bytes += os.path.getsize(path)
+        if _total_bytes > CACHE_MAX_BYTES:
+            evict()
+
+
+def _entries():
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if name.endswith(".png"):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+
+def _scan_size():
+    return sum(size for _, size, _ in _entries())
+
+
+def evict(max_bytes=CACHE_MAX_BYTES):
+    """Drop least recently used entries until under EVICT_TO_FRACTION of the cap"""
+    global _total_bytes
+    with _lock:
+        entries = sorted(_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = max_bytes * EVICT_TO_FRACTION
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        _total_bytes = total
+        if removed:
+            print(f"Board cache: evicted {removed} entries, {total / 1e6:.0f} MB kept")
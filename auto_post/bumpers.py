@@ -0,0 +1,129 @@
+"""Library of pre-encoded bumpers: break cards, intros and outros.
+
+A card looks the same in every video, so instead of compositing and
+libx264-encoding "Next Puzzle k/N" again for every break of every
+marathon, get_bumper() encodes each (card text, length, output profile)
+once into BUMPER_DIR and reuses the file from then on. render_spliced()
+renders only the board parts of a timeline, one segment per run of board
+scenes, and joins them with the cached bumpers by stream copy. Bumpers are
+encoded with the same profile settings as the segments, so the concat
+demuxer can splice them without re-encoding.
+
+The key covers everything that changes the clip (text, frames, profile
+settings, layout, audio mix, style version); bump BUMPER_STYLE_VERSION
+when the card design changes. The music bed restarts at each splice.
+"""
+import os
+import json
+import hashlib
+import threading
+
+from clip_library import concat_copy
+from renderer import (BACKGROUND_COLOR, FPS, LAYOUTS, card_scene, output_layout,
+                      render_timeline)
+
+# --- CONFIGURATION ---
+BUMPER_DIR = "bumpers"
+BUMPER_STYLE_VERSION = 1
+INTRO = ("Chess Sol Puzzles", "Can you find the winning move?")
+OUTRO = ("Follow for more", "New puzzles every day")
+INTRO_SEC = 2
+OUTRO_SEC = 3
+
+
+def intro_scene():
+    return card_scene(*INTRO, FPS * INTRO_SEC)
+
+
+def outro_scene():
+    return card_scene(*OUTRO, FPS * OUTRO_SEC)
+
+
+# --- LIBRARY ---
+def bumper_key(name, scene, audio_mix=(0.3, 0.7), output_args=None):
+    from profiles import PROFILES
+
+    raw = json.dumps([BUMPER_STYLE_VERSION, name, PROFILES.get(name), output_args,
+                      LAYOUTS[output_layout(name)], list(scene["card"]), scene["frames"], FPS,
+                      list(audio_mix), list(BACKGROUND_COLOR)], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def get_bumper(name, scene, ffmpeg_bin, audio_mix=(0.3, 0.7), output_args=None):
+    """Path of the encoded card for output `name` (profile or layout), encoding it on a miss"""
+    path = os.path.join(BUMPER_DIR, name, f"{bumper_key(name, scene, audio_mix, output_args)}.mp4")
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.mp4"
+    try:
+        # Cards always draw their text with PIL so one file serves either overlay mode
+        render_timeline([scene], {name: tmp}, ffmpeg_bin, audio_mix, output_args,
+                        overlay_mode="pil")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    print(f"Bumper: encoded {scene['card'][0]!r} for {name}")
+    return path
+
+
+def bare_clip_path(path):
+    """output_video/chess_short.mp4 -> output_video/chess_short_clip.mp4"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_clip{ext}"
+
+
+# --- SPLICED RENDER ---
+def split_timeline(scenes):
+    """[("card", scene) | ("board", [scenes...])] in timeline order"""
+    segments = []
+    for scene in scenes:
+        if "card" in scene:
+            segments.append(("card", scene))
+        elif segments and segments[-1][0] == "board":
+            segments[-1][1].append(scene)
+        else:
+            segments.append(("board", [scene]))
+    return segments
+
+
+def render_spliced(scenes, outputs, ffmpeg_bin, ws, audio_mix=(0.3, 0.7), output_args=None,
+                   progress=None, overlay_mode=None, workers=None, threads=None,
+                   board_segments=None):
+    """render_timeline() with every card scene taken from the bumper library.
+
+    Board segments are encoded into workspace ws and everything is joined
+    per output by stream copy. Returns the number of frames in each output.
+    A dict passed as board_segments receives {name: [board segment paths]}, so a
+    short can keep its bare puzzle render for the clip library.
+    """
+    segments = split_timeline(scenes)
+    total_frames = sum(scene["frames"] for scene in scenes)
+    if progress:
+        progress.start_render(total_frames, outputs, FPS)
+
+    parts = {name: [] for name in outputs}
+    frame_count = 0
+    for idx, (kind, item) in enumerate(segments):
+        if kind == "card":
+            for name in outputs:
+                parts[name].append(get_bumper(name, item, ffmpeg_bin, audio_mix, output_args))
+            frame_count += item["frames"]
+        else:
+            scratch = {name: ws.path(f"{name}_segment_{idx:03d}.mp4") for name in outputs}
+            frame_count += render_timeline(item, scratch, ffmpeg_bin, audio_mix, output_args,
+                                           overlay_mode=overlay_mode, workers=workers,
+                                           threads=threads)
+            for name, path in scratch.items():
+                parts[name].append(path)
+                if board_segments is not None:
+                    board_segments.setdefault(name, []).append(path)
+        if progress:
+            progress.frames_done(frame_count, item if kind == "card" else item[-1])
+
+    cards = sum(1 for kind, _ in segments if kind == "card")
+    print(f"Spliced {len(segments) - cards} rendered segments with {cards} bumpers")
+    for name, output in outputs.items():
+        concat_copy(ffmpeg_bin, parts[name], output, ws.path(f"{name}_splice.txt"))
+    return frame_count
@@ -0,0 +1,170 @@
+"""Library of already-encoded puzzle clips and marathon compilation.
+
+Every short we publish is recorded in CLIP_MANIFEST. compile_marathon()
+builds a long video out of those clips plus break cards from the bumper
+library (bumpers.py), joined with FFmpeg's concat demuxer and stream
+copy. Only clips whose codec parameters differ from the target profile
+are re-encoded. A profile the shorts never render (the landscape youtube
+cut) borrows another profile's clip, scaled and padded to fit.
+"""
+import os
+import json
+import time
+import subprocess
+
+# --- CONFIGURATION ---
+CLIP_MANIFEST = "output_video/clips.jsonl"
+
+# Stream properties that must match for a stream-copy concat to be valid
+CONCAT_KEYS = ("codec_name", "profile", "width", "height", "pix_fmt",
+               "r_frame_rate", "time_base", "sample_rate", "channels")
+
+# Clips to borrow, in order of preference, when a profile has none of its own
+CLIP_FALLBACKS = {
+    "youtube": ("facebook_feed", "x"),
+}
+
+
+# --- MANIFEST ---
+def record_clip(puzzle, profile, path, duration_sec):
+    """Append a published clip to the manifest"""
+    os.makedirs(os.path.dirname(CLIP_MANIFEST) or ".", exist_ok=True)
+    record = {
+        "puzzle": puzzle['id'],
+        "rating": puzzle.get('rating'),
+        "themes": puzzle.get('themes'),
+        "profile": profile,
+        "path": path,
+        "duration": round(duration_sec, 3),
+        "created": time.time(),
+    }
+    with open(CLIP_MANIFEST, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record) + "\n")
+
+
+def load_clips():
+    """{(puzzle_id, profile): newest record} for clips still on disk"""
+    clips = {}
+    if not os.path.exists(CLIP_MANIFEST):
+        return clips
+    with open(CLIP_MANIFEST, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if os.path.exists(record["path"]):
+                clips[(record["puzzle"], record["profile"])] = record
+    return clips
+
+
+def select_clips(profiles, num_puzzles):
+    """Newest puzzles with a clip, own or borrowed, for every requested profile.
+
+    Returns [{profile: record}]; a borrowed record carries "borrowed_from".
+    """
+    clips = load_clips()
+    by_puzzle = {}
+    for (puzzle_id, profile), record in clips.items():
+        by_puzzle.setdefault(puzzle_id, {})[profile] = record
+    complete = []
+    for recorded in by_puzzle.values():
+        chosen = {}
+        for name in profiles:
+            if name in recorded:
+                chosen[name] = recorded[name]
+                continue
+            source = next((s for s in CLIP_FALLBACKS.get(name, ()) if s in recorded), None)
+            if source:
+                chosen[name] = dict(recorded[source], borrowed_from=source)
+        if len(chosen) == len(profiles):
+            complete.append(chosen)
+    complete.sort(key=lambda p: max(r["created"] for r in p.values()), reverse=True)
+    return complete[:num_puzzles]
+
+
+# --- FFPROBE / NORMALIZE ---
+def stream_signature(ffprobe, path):
+    """Tuple of the CONCAT_KEYS for the video and audio streams of a file"""
+    out = subprocess.run(
+        [ffprobe, "-v", "error", "-show_entries",
+         "stream=codec_type," + ",".join(CONCAT_KEYS), "-of", "json", path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    streams = {s["codec_type"]: s for s in json.loads(out).get("streams", [])}
+    return tuple(
+        (kind, tuple(str(streams.get(kind, {}).get(k, "")) for k in CONCAT_KEYS))
+        for kind in ("video", "audio")
+    )
+
+
+def normalize_clip(ffmpeg, src, dst, profile_name, fps):
+    """Re-encode a clip to the profile's size, frame rate and codec settings"""
+    from profiles import PROFILES, output_args
+
+    w, h = PROFILES[profile_name]["size"]
+    vf = (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+          f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,fps={fps}")
+    subprocess.run(
+        [ffmpeg, "-y", "-hide_banner", "-loglevel", "warning", "-i", src,
+         "-vf", vf, *output_args(profile_name, fps), dst],
+        check=True
+    )
+    return dst
+
+
+def concat_copy(ffmpeg, parts, output, list_path):
+    """Join parts with the concat demuxer without re-encoding"""
+    with open(list_path, "w") as fh:
+        for part in parts:
+            escaped = os.path.abspath(part).replace("'", "'\\''")
+            fh.write(f"file '{escaped}'\n")
+    subprocess.run(
+        [ffmpeg, "-y", "-hide_banner", "-loglevel", "warning",
+         "-f", "concat", "-safe", "0", "-i", list_path,
+         "-c", "copy", "-movflags", "+faststart", output],
+        check=True
+    )
+
+
+# --- COMPILATION ---
+def compile_marathon(profile_name, puzzles, output, ws, ffmpeg, ffprobe, fps):
+    """Assemble one profile's marathon from recorded clips inside workspace ws.
+
+    puzzles is select_clips() output. Returns the total duration in seconds.
+    """
+    from bumpers import get_bumper
+    from renderer import break_scene
+
+    total = len(puzzles)
+
+    # Break cards are encoded with the profile's own settings, so the first
+    # one doubles as the reference signature clips must match
+    cards = []
+    for idx in range(1, total):
+        scene = break_scene(idx, total)
+        cards.append((get_bumper(profile_name, scene, ffmpeg), scene["frames"] / fps))
+    target = stream_signature(ffprobe, cards[0][0]) if cards else None
+
+    parts = []
+    duration = 0.0
+    normalized = 0
+    for idx, clips in enumerate(puzzles, 1):
+        if idx > 1:
+            card, card_sec = cards[idx - 2]
+            parts.append(card)
+            duration += card_sec
+
+        clip = clips[profile_name]
+        path = clip["path"]
+        # Borrowed clips have another profile's size: always scale and pad them
+        if clip.get("borrowed_from") or (target and stream_signature(ffprobe, path) != target):
+            path = normalize_clip(ffmpeg, path, ws.path(f"{profile_name}_clip_{idx}.mp4"),
+                                  profile_name, fps)
+            normalized += 1
+        parts.append(path)
+        duration += clip["duration"]
+
+    print(f"[{profile_name}] {total} clips ({normalized} normalized), {len(cards)} break cards")
+    concat_copy(ffmpeg, parts, output, ws.path(f"{profile_name}_concat.txt"))
+    return duration
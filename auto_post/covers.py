@@ -0,0 +1,144 @@
+"""Cover images and small animated previews written alongside each render.
+
+Both are built from the scene timeline the video was just rendered from,
+through get_board_layer(), so the board layers come straight out of the
+in-process LRU (or board_cache/ after a parallel render) instead of being
+rasterized again or decoded back out of the MP4:
+
+    cover_image()        the puzzle position (after the setup move) on a
+                         layout canvas with a branded band, as JPEG
+    animated_preview()   position -> every solution move, downscaled, as
+                         animated WebP (GIF when Pillow lacks WebP animation)
+
+Files are named by puzzle id in COVER_DIR, so the site can map
+`?puzzle=<id>` to covers/<id>.jpg and covers/<id>.webp.
+"""
+import os
+
+from renderer import BOARD_SIZE, compose_frame, get_board_layer, get_font, output_layout
+
+# --- CONFIGURATION ---
+COVER_DIR = "covers"
+COVER_QUALITY = 88
+BRAND_TEXT = "Chess Sol Puzzles"
+CALL_TO_ACTION = "Can you solve it?"
+BRAND_BAND = (0, 0, 0, 170)           # RGBA of the band behind the branding
+ANIM_SIZE = 360
+ANIM_FIRST_MS = 1500
+ANIM_MOVE_MS = 800
+ANIM_LAST_MS = 2500
+ANIM_QUALITY = 70
+
+
+# --- UTILITY FUNCTIONS ---
+def puzzle_positions(scenes):
+    """The position the solver faces, then one scene per solution move.
+
+    One scene per distinct FEN, taking the one that played the move so its
+    highlight shows; countdown ticks and the final pause add nothing.
+    """
+    positions, index = [], {}
+    for scene in scenes:
+        if "card" in scene:
+            continue
+        fen = scene["fen"]
+        if fen not in index:
+            index[fen] = len(positions)
+            positions.append(scene)
+        elif scene["last_move"] and not positions[index[fen]]["last_move"]:
+            positions[index[fen]] = scene
+    # [start, setup move, solution...]; single-position timelines just repeat
+    return positions[1:] or positions
+
+
+def _cover_scene(scene):
+    overlay = {k: v for k, v in scene["overlay"].items() if k not in ("timer", "message")}
+    return dict(scene, overlay=overlay)
+
+
+# --- COVER ---
+def cover_image(scenes, path, layout_name="square"):
+    """JPEG cover: the puzzle position with its overlay text and a brand band"""
+    from PIL import Image, ImageDraw
+
+    scene = _cover_scene(puzzle_positions(scenes)[0])
+    im = compose_frame(layout_name, scene, get_board_layer(scene["fen"], scene["last_move"]))
+
+    w, h = im.size
+    band_h = BOARD_SIZE // 10
+    band = Image.new("RGBA", (w, band_h), BRAND_BAND)
+    im.paste(band, (0, h - band_h), band)
+    draw = ImageDraw.Draw(im)
+    brand_font, cta_font = get_font(band_h * 4 // 10), get_font(band_h // 2)
+    margin = band_h // 4
+    draw.text((margin, h - band_h // 2), BRAND_TEXT, font=brand_font, fill="white", anchor="lm")
+    draw.text((w - margin, h - band_h // 2), CALL_TO_ACTION, font=cta_font, fill="yellow",
+              anchor="rm")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    im.save(path, "JPEG", quality=COVER_QUALITY, optimize=True)
+    return path
+
+
+# --- ANIMATED PREVIEW ---
+def preview_format():
+    """'webp' when this Pillow can write animated WebP, else 'gif'"""
+    from PIL import features
+
+    if not features.check_module("webp"):
+        return "gif"
+    try:
+        return "webp" if features.check_feature("webp_anim") else "gif"
+    except ValueError:
+        return "webp"   # Pillow 11+ dropped the flag; its WebP always animates
+
+
+def animated_preview(scenes, path_stem, size=ANIM_SIZE):
+    """Looping preview of the solution; returns the path written (stem + .webp/.gif)"""
+    from PIL import Image
+
+    positions = puzzle_positions(scenes)
+    frames = [get_board_layer(s["fen"], s["last_move"]).resize((size, size), Image.LANCZOS)
+              for s in positions]
+    durations = [ANIM_MOVE_MS] * len(frames)
+    durations[0] = ANIM_FIRST_MS
+    durations[-1] = ANIM_LAST_MS if len(frames) > 1 else ANIM_FIRST_MS + ANIM_LAST_MS
+
+    fmt = preview_format()
+    path = f"{path_stem}.{fmt}"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if fmt == "webp":
+        frames[0].save(path, "WEBP", save_all=True, append_images=frames[1:], duration=durations,
+                       loop=0, quality=ANIM_QUALITY, method=4)
+    else:
+        # One shared palette keeps the board colours from flickering between frames
+        palette = frames[0].quantize(colors=128)
+        frames = [f.quantize(palette=palette) for f in frames]
+        frames[0].save(path, "GIF", save_all=True, append_images=frames[1:], duration=durations,
+                       loop=0, optimize=True)
+    return path
+
+
+def write_covers(scenes, puzzle_id, names=("square",), out_dir=COVER_DIR):
+    """Cover per layout used by names (profiles or layouts) plus one animated preview.
+
+    Returns {"cover": path, "cover_<layout>": path..., "preview": path}; the
+    square cover (or the first layout's) is "cover".
+    """
+    layouts = []
+    for name in names:
+        layout_name = output_layout(name)
+        if layout_name not in layouts:
+            layouts.append(layout_name)
+    if "square" in layouts:
+        layouts.remove("square")
+        layouts.insert(0, "square")
+
+    paths = {}
+    for idx, layout_name in enumerate(layouts):
+        suffix = "" if idx == 0 else f"_{layout_name}"
+        key = "cover" if idx == 0 else f"cover_{layout_name}"
+        paths[key] = cover_image(scenes, os.path.join(out_dir, f"{puzzle_id}{suffix}.jpg"),
+                                 layout_name)
+    paths["preview"] = animated_preview(scenes, os.path.join(out_dir, str(puzzle_id)))
+    return paths
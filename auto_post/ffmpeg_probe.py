@@ -0,0 +1,104 @@
+"""Locate FFmpeg and cache what it can do.
+
+detect_ffmpeg() used to run (PATH scan plus chmod) at import time in every
+script. probe() runs it on first use instead and records the binary path,
+version, encoders and the text filters we care about (drawtext, ass) in a
+small JSON cache keyed by the binary's path, size and mtime, so later runs
+skip the `ffmpeg -encoders` / `-filters` calls entirely.
+"""
+import os
+import json
+import shutil
+import subprocess
+
+# --- CONFIGURATION ---
+LOCAL_FFMPEG = "./ffmpeg-7.0.2-amd64-static/ffmpeg"
+PROBE_CACHE = ".ffmpeg_probe.json"
+
+_probe = None
+
+
+def detect_ffmpeg():
+    ffmpeg_bin = shutil.which("ffmpeg")
+    if ffmpeg_bin:
+        return ffmpeg_bin
+    local_bin = LOCAL_FFMPEG
+    if os.path.exists(local_bin):
+        if not os.access(local_bin, os.X_OK):
+            os.chmod(local_bin, 0o755)
+        return local_bin
+    raise FileNotFoundError("FFmpeg not found")
+
+
+def _fingerprint(ffmpeg_bin):
+    st = os.stat(ffmpeg_bin)
+    return [os.path.realpath(ffmpeg_bin), st.st_size, int(st.st_mtime)]
+
+
+def _list(ffmpeg_bin, what):
+    """Names from `ffmpeg -encoders` / `-filters`, skipping header and legend"""
+    out = subprocess.run([ffmpeg_bin, "-hide_banner", f"-{what}"],
+                         capture_output=True, text=True, check=True).stdout
+    names = []
+    for line in out.splitlines():
+        parts = line.split()
+        # Legend lines read "V..... = Video"; entries are "<flags> <name> ..."
+        if len(parts) >= 2 and parts[1] != "=":
+            names.append(parts[1])
+    return names
+
+
+def _run_probe(ffmpeg_bin):
+    version = subprocess.run([ffmpeg_bin, "-hide_banner", "-version"],
+                             capture_output=True, text=True, check=True).stdout
+    filters = _list(ffmpeg_bin, "filters")
+    return {
+        "bin": ffmpeg_bin,
+        "fingerprint": _fingerprint(ffmpeg_bin),
+        "version": version.splitlines()[0] if version else "",
+        "encoders": _list(ffmpeg_bin, "encoders"),
+        "drawtext": "drawtext" in filters,
+        "ass": "ass" in filters,
+    }
+
+
+def probe():
+    """FFmpeg capabilities, from memory, the disk cache or a fresh probe"""
+    global _probe
+    if _probe is not None:
+        return _probe
+    ffmpeg_bin = detect_ffmpeg()
+    try:
+        with open(PROBE_CACHE) as fh:
+            cached = json.load(fh)
+        if cached.get("fingerprint") == _fingerprint(ffmpeg_bin):
+            _probe = cached
+            return _probe
+    except (OSError, ValueError):
+        pass
+    _probe = _run_probe(ffmpeg_bin)
+    try:
+        with open(PROBE_CACHE, "w") as fh:
+            json.dump(_probe, fh)
+    except OSError:
+        pass  # read-only working directory: just probe again next time
+    return _probe
+
+
+def ffmpeg_bin():
+    return probe()["bin"]
+
+
+def has_encoder(name):
+    return name in probe()["encoders"]
+
+
+def ffprobe_bin():
+    """ffprobe next to the FFmpeg binary, else the one on PATH"""
+    sibling = os.path.join(os.path.dirname(ffmpeg_bin()), "ffprobe")
+    if os.path.exists(sibling):
+        return sibling
+    found = shutil.which("ffprobe")
+    if found:
+        return found
+    raise FileNotFoundError("ffprobe not found")
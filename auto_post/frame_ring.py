@@ -0,0 +1,169 @@
+"""Shared-memory frame ring between render worker processes and the encoders.
+
+render_parallel() composites scenes in worker processes without pickling
+frames: each layout gets a multiprocessing.shared_memory block cut into
+fixed-size slots, and a worker writes a finished canvas straight into its
+slot through a NumPy view. Only (seq, slot) indices cross process
+boundaries. In the parent, the writer hands each slot's memoryview to the
+layout's Encoders in timeline order and recycles the slot once every
+encoder has written it.
+
+Slots are handed out in timeline order by a dispatcher thread, so the
+oldest unfinished scene always has a slot (no deadlock with out-of-order
+workers) and a slow encoder stops dispatch once the ring is full
+(back-pressure).
+"""
+import queue
+import threading
+import traceback
+
+# --- CONFIGURATION ---
+SLOTS_PER_WORKER = 2
+
+
+# --- WORKER SIDE ---
+def _worker(scenes, rings, draw_text, tasks, results):
+    """Composite scenes into ring slots until a None task arrives"""
+    from multiprocessing import shared_memory
+    import numpy as np
+    from renderer import LAYOUTS, compose_frame, get_board_layer
+
+    blocks = {layout: shared_memory.SharedMemory(name=name) for layout, (name, _) in rings.items()}
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slots = task
+            try:
+                scene = scenes[seq]
+                layer = None
+                if "card" not in scene:
+                    layer = get_board_layer(scene["fen"], scene["last_move"])
+                for layout, slot in slots.items():
+                    w, h = LAYOUTS[layout]["size"]
+                    slot_bytes = rings[layout][1]
+                    view = np.ndarray((h, w, 3), dtype=np.uint8, buffer=blocks[layout].buf,
+                                      offset=slot * slot_bytes)
+                    view[...] = np.asarray(compose_frame(layout, scene, layer, draw_text))
+                    del view
+                results.put((seq, slots, None))
+            except Exception:
+                results.put((seq, slots, traceback.format_exc()))
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+# --- PARENT SIDE ---
+def render_parallel(scenes, outputs, ffmpeg_bin, workers, audio_mix=(0.3, 0.7), output_args=None,
+                    progress=None, overlay_mode=None, slots=None, threads=None):
+    """render_timeline() with scenes composited by `workers` processes"""
+    import multiprocessing
+    from multiprocessing import shared_memory
+    from renderer import LAYOUTS, abort_encoders, close_encoders, open_encoders, output_layout
+
+    ctx = multiprocessing.get_context("spawn")
+    slots = slots or workers * SLOTS_PER_WORKER + 1
+    layouts = sorted({output_layout(name) for name in outputs})
+    blocks, rings, free = {}, {}, {}
+    procs, started = [], []
+    encoders, ass_files = {}, {}
+    stop = threading.Event()
+    try:
+        for layout in layouts:
+            w, h = LAYOUTS[layout]["size"]
+            slot_bytes = w * h * 3
+            blocks[layout] = shared_memory.SharedMemory(create=True, size=slot_bytes * slots)
+            rings[layout] = (blocks[layout].name, slot_bytes)
+            free[layout] = queue.Queue()
+            for slot in range(slots):
+                free[layout].put(slot)
+
+        encoders, ass_files, overlay_mode = open_encoders(
+            scenes, outputs, ffmpeg_bin, audio_mix, output_args, progress, overlay_mode, threads)
+        by_layout = {}
+        for layout, encoder in encoders.values():
+            by_layout.setdefault(layout, []).append(encoder)
+
+        # Workers are spawned, so only the scene list is pickled, once per worker
+        tasks, results = ctx.Queue(), ctx.Queue()
+        draw_text = overlay_mode != "ass"
+        procs = [ctx.Process(target=_worker, args=(scenes, rings, draw_text, tasks, results),
+                             daemon=True) for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+            started.append(proc)
+
+        def dispatch():
+            for seq in range(len(scenes)):
+                claimed = {}
+                for layout in layouts:
+                    while not stop.is_set():
+                        try:
+                            claimed[layout] = free[layout].get(timeout=0.5)
+                            break
+                        except queue.Empty:
+                            continue
+                if stop.is_set():
+                    return
+                tasks.put((seq, claimed))
+            for _ in procs:
+                tasks.put(None)
+
+        dispatcher = threading.Thread(target=dispatch, daemon=True)
+        dispatcher.start()
+
+        frame_count = 0
+        pending = {}
+        next_seq = 0
+        while next_seq < len(scenes):
+            try:
+                seq, slot_map, error = results.get(timeout=5)
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in procs):
+                    raise RuntimeError("All render workers exited")
+                continue
+            if error:
+                raise RuntimeError(f"Render worker failed on scene {seq}:\n{error}")
+            pending[seq] = slot_map
+            while next_seq in pending:
+                slot_map = pending.pop(next_seq)
+                scene = scenes[next_seq]
+                done = []
+                for layout, slot in slot_map.items():
+                    _, slot_bytes = rings[layout]
+                    view = blocks[layout].buf[slot * slot_bytes:(slot + 1) * slot_bytes]
+                    for encoder in by_layout[layout]:
+                        event = threading.Event()
+                        encoder.write(view, scene["frames"], done=event)
+                        done.append(event)
+                for event in done:
+                    event.wait()
+                del view
+                for layout, slot in slot_map.items():
+                    free[layout].put(slot)
+                frame_count += scene["frames"]
+                if progress:
+                    progress.frames_done(frame_count, scene)
+                next_seq += 1
+        close_encoders(encoders, ass_files)
+    except BaseException:
+        stop.set()
+        abort_encoders(encoders, ass_files)
+        raise
+    finally:
+        stop.set()
+        # Only processes that started can be joined; a failed start must not mask its error
+        for proc in started:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        for block in blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                pass  # an aborted encoder thread still holds a view; unlink frees it
+            block.unlink()
+    return frame_count
+
@@ -0,0 +1,246 @@
+"""Golden-frame harness for alternate board renderers.
+
+Renders a fixed set of fixture scenes (every layout, with and without last
+move highlight, countdown timer, info text and break cards) through the
+reference path, chess.svg + cairosvg + compose_frame(), and through an
+alternate engine, then reports per-pixel and perceptual (block SSIM)
+differences together with the speedup.
+
+An engine is any callable engine(layout_name, scene) -> PIL RGB image,
+either one of ENGINES or "module:function":
+
+    python golden_frames.py compare --engine cached
+    python golden_frames.py compare --engine sprite_renderer:render_frame
+    python golden_frames.py record        # snapshot the reference to GOLDEN_DIR
+    python golden_frames.py compare --engine reference --golden
+
+With --golden the expected frames come from GOLDEN_DIR instead of a live
+reference render, so a change to the reference path itself can be checked.
+The exit status is non-zero when any frame is over the thresholds.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+
+from renderer import (LAYOUTS, build_puzzle_timeline, break_scene, compose_frame,
+                      get_board_layer, render_board_layer, solver_side)
+
+# --- CONFIGURATION ---
+GOLDEN_DIR = "golden_frames"
+PIXEL_TOLERANCE = 8        # per-channel difference still counted as equal
+MAX_CHANGED_PCT = 0.5      # share of pixels allowed over PIXEL_TOLERANCE
+MIN_SSIM = 0.98            # mean block SSIM on luma
+SSIM_BLOCK = 8
+REPEATS = 3                # timing runs per frame; the fastest is kept
+
+FIXTURE_PUZZLES = [
+    # Middlegame fork, black to move first (white solves)
+    {"id": "003jb", "fen": "r3kb1r/p4ppp/b1p1p3/3q4/3Q4/4BN2/PPP2PPP/R3K2R b KQkq - 0 11",
+     "moves": "c6c5 d4a4 a6b5 a4b5", "rating": 1003},
+    # Short mate, white to move first (black solves)
+    {"id": "00Bm8", "fen": "8/6kp/4b1q1/1p6/1PpPp2Q/2P1P3/r2N2P1/5RK1 w - - 7 34",
+     "moves": "d2e4 g6g2", "rating": 1126},
+    # Bare-board promotion on the last move
+    {"id": "promo", "fen": "8/P5k1/8/8/8/8/6K1/8 b - - 0 1",
+     "moves": "g7f7 a7a8q", "rating": 800},
+]
+
+
+# --- FIXTURES ---
+def fixture_scenes():
+    """(name, layout, scene) for the representative scenes of every fixture"""
+    scenes = []
+    for puzzle in FIXTURE_PUZZLES:
+        timeline = build_puzzle_timeline(
+            puzzle["fen"], puzzle["moves"], puzzle["rating"], solver_side(puzzle["fen"]),
+            outro_message="Solution shown!", puzzle_num=2, total_puzzles=60,
+            message="Spot the winning sequence!"
+        )
+        # Opening position, setup move, first countdown tick, final position
+        picks = {"start": timeline[0], "setup": timeline[1],
+                 "timer": timeline[2], "final": timeline[-1]}
+        for label, scene in picks.items():
+            for layout in LAYOUTS:
+                scenes.append((f"{puzzle['id']}_{label}_{layout}", layout, scene))
+    for layout in LAYOUTS:
+        scenes.append((f"break_{layout}", layout, break_scene(1, 60)))
+    return scenes
+
+
+# --- ENGINES ---
+def reference_engine(layout_name, scene):
+    """Today's path: a fresh chess.svg + cairosvg raster for every frame"""
+    layer = None
+    if "card" not in scene:
+        layer = render_board_layer(scene["fen"], scene["last_move"])
+    return compose_frame(layout_name, scene, layer)
+
+
+def cached_engine(layout_name, scene):
+    """The production path with the memory and on-disk board caches"""
+    layer = None
+    if "card" not in scene:
+        layer = get_board_layer(scene["fen"], scene["last_move"])
+    return compose_frame(layout_name, scene, layer)
+
+
+ENGINES = {
+    "reference": reference_engine,
+    "cached": cached_engine,
+}
+
+
+def load_engine(spec):
+    if spec in ENGINES:
+        return ENGINES[spec]
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown engine {spec!r}; use one of {list(ENGINES)} or module:function")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+# --- COMPARISON ---
+def _block_ssim(a, b, block=SSIM_BLOCK):
+    """Mean SSIM over non-overlapping blocks of two luma arrays"""
+    h, w = (a.shape[0] // block) * block, (a.shape[1] // block) * block
+    a = a[:h, :w].reshape(h // block, block, w // block, block)
+    b = b[:h, :w].reshape(h // block, block, w // block, block)
+    mu_a, mu_b = a.mean(axis=(1, 3)), b.mean(axis=(1, 3))
+    var_a, var_b = a.var(axis=(1, 3)), b.var(axis=(1, 3))
+    cov = ((a - mu_a[:, None, :, None]) * (b - mu_b[:, None, :, None])).mean(axis=(1, 3))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    ssim = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / \
+        ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim.mean())
+
+
+def compare_images(expected, actual):
+    """{max_diff, changed_pct, ssim, ok} for two RGB images"""
+    import numpy as np
+
+    if expected.size != actual.size:
+        return {"max_diff": 255, "changed_pct": 100.0, "ssim": 0.0, "ok": False,
+                "error": f"size {actual.size} != {expected.size}"}
+    a = np.asarray(expected.convert("RGB"), dtype=np.int16)
+    b = np.asarray(actual.convert("RGB"), dtype=np.int16)
+    diff = np.abs(a - b).max(axis=2)
+    changed_pct = float((diff > PIXEL_TOLERANCE).mean() * 100)
+    luma = np.array([0.299, 0.587, 0.114])
+    ssim = _block_ssim(a @ luma, b @ luma)
+    return {
+        "max_diff": int(diff.max()),
+        "changed_pct": round(changed_pct, 4),
+        "ssim": round(ssim, 5),
+        "ok": changed_pct <= MAX_CHANGED_PCT and ssim >= MIN_SSIM,
+    }
+
+
+def diff_image(expected, actual):
+    """Changed pixels in red over a dimmed copy of the expected frame"""
+    import numpy as np
+    from PIL import Image
+
+    a = np.asarray(expected.convert("RGB"), dtype=np.int16)
+    b = np.asarray(actual.convert("RGB"), dtype=np.int16)
+    out = (a // 3).astype(np.uint8)
+    out[np.abs(a - b).max(axis=2) > PIXEL_TOLERANCE] = (255, 0, 0)
+    return Image.fromarray(out)
+
+
+def timed(engine, layout, scene, repeats=REPEATS):
+    """(image, fastest seconds) over `repeats` runs"""
+    best, image = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        image = engine(layout, scene)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return image, best
+
+
+def golden_path(name):
+    return os.path.join(GOLDEN_DIR, f"{name}.png")
+
+
+def record(repeats=1):
+    """Snapshot reference frames and the library versions that produced them"""
+    import chess
+    import cairosvg
+    import PIL
+
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    fixtures = fixture_scenes()
+    for name, layout, scene in fixtures:
+        image, _ = timed(reference_engine, layout, scene, repeats)
+        image.save(golden_path(name))
+    with open(os.path.join(GOLDEN_DIR, "versions.json"), "w") as fh:
+        json.dump({"chess": chess.__version__, "cairosvg": cairosvg.__version__,
+                   "pillow": PIL.__version__}, fh, indent=2)
+    print(f"Recorded {len(fixtures)} golden frames to {GOLDEN_DIR}/")
+
+
+def compare(engine_spec, use_golden=False, repeats=REPEATS, write_diffs=True):
+    """Compare an engine with the reference; returns the number of failing frames"""
+    from PIL import Image
+
+    engine = load_engine(engine_spec)
+    fixtures = fixture_scenes()
+    ref_total = alt_total = 0.0
+    failures = 0
+
+    print(f"{'frame':<28} {'max':>4} {'changed%':>9} {'ssim':>8} {'ref ms':>8} {'alt ms':>8}")
+    for name, layout, scene in fixtures:
+        if use_golden:
+            with Image.open(golden_path(name)) as im:
+                expected = im.convert("RGB")
+            ref_sec = 0.0
+        else:
+            expected, ref_sec = timed(reference_engine, layout, scene, repeats)
+        actual, alt_sec = timed(engine, layout, scene, repeats)
+        ref_total += ref_sec
+        alt_total += alt_sec
+
+        result = compare_images(expected, actual)
+        flag = "" if result["ok"] else "  <-- " + result.get("error", "over threshold")
+        print(f"{name:<28} {result['max_diff']:>4} {result['changed_pct']:>9.3f} "
+              f"{result['ssim']:>8.4f} {ref_sec * 1000:>8.1f} {alt_sec * 1000:>8.1f}{flag}")
+        if not result["ok"]:
+            failures += 1
+            if write_diffs and "error" not in result:
+                os.makedirs(os.path.join(GOLDEN_DIR, "diff"), exist_ok=True)
+                diff_image(expected, actual).save(
+                    os.path.join(GOLDEN_DIR, "diff", f"{name}_{engine_spec.replace(':', '_')}.png"))
+
+    print(f"\n{len(fixtures) - failures}/{len(fixtures)} frames within thresholds "
+          f"(changed <= {MAX_CHANGED_PCT}%, ssim >= {MIN_SSIM})")
+    if ref_total and alt_total:
+        print(f"Reference {ref_total * 1000:.0f} ms, {engine_spec} {alt_total * 1000:.0f} ms, "
+              f"speedup {ref_total / alt_total:.2f}x")
+    return failures
+
+
+# --- MAIN SCRIPT ---
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check an alternate renderer against golden frames")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("record", help="save reference frames to GOLDEN_DIR")
+    cmp_parser = sub.add_parser("compare", help="compare an engine with the reference")
+    cmp_parser.add_argument("--engine", default="cached",
+                            help=f"one of {', '.join(ENGINES)} or module:function")
+    cmp_parser.add_argument("--golden", action="store_true",
+                            help="compare against recorded frames instead of a live reference")
+    cmp_parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record()
+        return
+    sys.exit(1 if compare(args.engine, args.golden, args.repeats) else 0)
+
+
+if __name__ == "__main__":
+    main()
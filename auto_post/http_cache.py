@@ -0,0 +1,193 @@
+"""On-disk cache for JSON API responses.
+
+The /api/puzzles result sets the marathon asks for barely change between
+runs, so puzzle_source goes through get_json() instead of calling the
+session directly. Entries are keyed by the normalized URL and query
+parameters and handled in three tiers:
+
+    fresh    younger than the caller's ttl: served without any request
+    expired  revalidated with If-None-Match / If-Modified-Since when the
+             server sent an ETag / Last-Modified; a 304 just renews it
+    stale    kept for STALE_MAX_SEC and served when the API is down
+             (connection errors, timeouts, 429 and 5xx responses)
+
+Responses marked Cache-Control: no-store are never written. Entries past
+STALE_MAX_SEC are swept by purge(), which get_json() runs whenever the last
+sweep by any process is more than PURGE_EVERY_SEC old.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# --- CONFIGURATION ---
+CACHE_DIR = "http_cache"
+DEFAULT_TTL = 6 * 3600
+STALE_MAX_SEC = 7 * 24 * 3600      # oldest entry still served when the API fails
+PURGE_EVERY_SEC = 24 * 3600        # expired entries are swept at most this often
+PURGE_MARKER = os.path.join(CACHE_DIR, ".last_purge")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+stats = {"fresh": 0, "revalidated": 0, "fetched": 0, "stale": 0}
+_lock = threading.Lock()
+_next_purge_check = 0
+
+
+def _count(kind):
+    with _lock:
+        stats[kind] += 1
+
+
+# --- KEYS AND ENTRIES ---
+def normalize(url, params=None):
+    """Stable text for a request: lower-cased scheme/host, sorted params, no Nones"""
+    parts = urlsplit(url)
+    query = [(str(k), str(v)) for k, v in (params or {}).items() if v is not None]
+    query = sorted(query + parse_qsl(parts.query, keep_blank_values=True))
+    base = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", "", ""))
+    return f"{base}?{urlencode(query)}" if query else base
+
+
+def _path(key):
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, digest[:2], f"{digest}.json")
+
+
+def load(key):
+    """Cached entry dict or None"""
+    try:
+        with open(_path(key), encoding="utf-8") as fh:
+            entry = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("key") == key else None
+
+
+def has_entry(url, params=None):
+    """True when get_json() could answer this request without the API"""
+    entry = load(normalize(url, params))
+    return bool(entry) and time.time() - entry["fetched_at"] <= STALE_MAX_SEC
+
+
+def store(key, entry):
+    path = _path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(dict(entry, key=key), fh)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"HTTP cache write failed: {e}")
+
+
+# --- REQUESTS ---
+def _serve_stale(entry, error):
+    age = time.time() - entry["fetched_at"] if entry else None
+    if entry is None or age > STALE_MAX_SEC:
+        raise error
+    _count("stale")
+    print(f"API unavailable ({error}); using cached response from {age / 3600:.1f}h ago")
+    return json.loads(entry["body"])
+
+
+def get_json(session, url, params=None, ttl=DEFAULT_TTL, timeout=30):
+    """session.get(url, params).json(), through the cache.
+
+    ttl=0 always revalidates. HTTP errors other than RETRY_STATUSES are
+    raised as usual, without falling back to a stale entry.
+    """
+    import requests
+
+    _purge_if_due()
+    key = normalize(url, params)
+    entry = load(key)
+    if entry and time.time() - entry["fetched_at"] < ttl:
+        _count("fresh")
+        return json.loads(entry["body"])
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        return _serve_stale(entry, e)
+
+    if response.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        store(key, entry)
+        _count("revalidated")
+        return json.loads(entry["body"])
+    if response.status_code in RETRY_STATUSES:
+        return _serve_stale(entry, requests.HTTPError(
+            f"{response.status_code} from {response.url}", response=response))
+    response.raise_for_status()
+
+    body = response.text
+    data = json.loads(body)
+    if "no-store" not in response.headers.get("Cache-Control", ""):
+        store(key, {
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": body,
+        })
+    _count("fetched")
+    return data
+
+
+def purge(max_age=STALE_MAX_SEC):
+    """Delete entries older than max_age; returns how many went"""
+    removed = 0
+    now = time.time()
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    fetched_at = json.load(fh).get("fetched_at", 0)
+            except (OSError, ValueError):
+                fetched_at = 0
+            if now - fetched_at > max_age:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
+
+
+def summary():
+    return ", ".join(f"{n} {kind}" for kind, n in stats.items() if n) or "no requests"
+
+
+def _purge_if_due():
+    """purge() when the last sweep by any process is PURGE_EVERY_SEC old"""
+    global _next_purge_check
+    now = time.time()
+    with _lock:
+        if now < _next_purge_check:
+            return
+        _next_purge_check = now + PURGE_EVERY_SEC
+    try:
+        if now - os.path.getmtime(PURGE_MARKER) < PURGE_EVERY_SEC:
+            return
+    except OSError:
+        pass   # never swept
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(PURGE_MARKER, "w"):
+            pass
+    except OSError:
+        return
+    removed = purge()
+    if removed:
+        print(f"HTTP cache: purged {removed} expired entries")
@@ -0,0 +1,458 @@
+"""Never-ending "chess puzzle radio": a live stream rendered just in time.
+
+Everything else in auto_post renders a finished timeline into files. Here
+three threads keep one FFmpeg process fed forever instead:
+
+    picker    selects puzzles (pool or API) into a small queue of upcoming ones
+    renderer  turns them into scenes and composites each scene once, into a
+              lookahead buffer of LOOKAHEAD_SEC of stream time
+    pacer     takes frames off the buffer at exactly FPS against the wall
+              clock and writes them to FFmpeg, which loops the music bed
+              (read at native rate with -re) and pushes to the output URL
+
+A scene is composited once and repeated for its frame count, so the
+renderer runs far ahead of real time and the buffer stays full. When it
+does run dry the pacer repeats the last frame, which keeps the stream at a
+constant frame rate, and counts an underrun. If FFmpeg dies (the ingest
+server dropped the connection) it is restarted after RECONNECT_SEC with the
+buffer intact.
+
+Every UPDATE_SEC a status line is printed and status/live.json and
+status/live.prom (chess_live_* gauges) are rewritten. lead_seconds is how
+far the renderer is ahead of the wall clock; alert on it approaching 0 or
+on underrun_frames growing.
+
+rtmp:// and rtmps:// are sent as FLV, srt:// and udp:// as MPEG-TS; any
+other target is a file whose muxer FFmpeg picks from the extension. To
+test locally, start a listener first and then the stream:
+
+    ffmpeg -listen 1 -i rtmp://127.0.0.1:1935/live/test -c copy live_test.flv
+    python live_stream.py --url rtmp://127.0.0.1:1935/live/test --duration 120
+
+    ffplay udp://127.0.0.1:1234
+    python live_stream.py --url udp://127.0.0.1:1234 --profile x
+"""
+import os
+import json
+import time
+import queue
+import signal
+import argparse
+import threading
+from collections import deque
+
+from ffmpeg_probe import ffmpeg_bin
+from profiles import PROFILES, scale_filter
+from progress import STATUS_DIR, UPDATE_SEC
+from puzzle_pool import load_pool
+from puzzle_source import annotate, fetch_puzzle
+from renderer import (BACKGROUND_MUSIC, BREAK_SEC, FPS, LAYOUTS, Encoder, build_puzzle_timeline,
+                      card_scene, compose_frame, get_board_layer, solver_side)
+
+# --- CONFIGURATION ---
+LIVE_PROFILE = "youtube"
+LIVE_PRESET = "veryfast"       # must encode comfortably faster than real time
+LIVE_GOP_SEC = 2               # ingest servers want a keyframe at least every 2-4s
+LOOKAHEAD_SEC = 30             # stream time the renderer may run ahead
+PREROLL_SEC = 5                # buffered before the first frame goes out
+LOOKAHEAD_PUZZLES = 3          # puzzles selected ahead of the renderer
+RECENT_PUZZLES = 500           # ids not repeated within this many puzzles
+MIN_RATING = 1200
+MAX_RATING = 2400
+MUSIC_VOLUME = 0.3
+MAX_LAG_SEC = 2.0              # behind the clock by more than this: restart the pacing clock
+RECONNECT_SEC = 5
+RETRY_SEC = 10
+JOB_NAME = "live"
+METRIC_PREFIX = "chess_live"
+
+
+# --- FFMPEG ---
+def output_format(url):
+    """Muxer options for the target: FLV for RTMP, MPEG-TS for SRT/UDP"""
+    scheme = url.split("://", 1)[0].lower() if "://" in url else ""
+    if scheme in ("rtmp", "rtmps"):
+        return ["-f", "flv", "-flvflags", "no_duration_filesize"]
+    if scheme in ("srt", "udp"):
+        return ["-f", "mpegts"]
+    return ["-y"]
+
+
+def live_output_args(name, fps=FPS):
+    """Constant-bitrate encode at the profile's cap, with a fixed keyframe interval"""
+    p = PROFILES[name]
+    gop = max(1, int(round(fps * LIVE_GOP_SEC)))
+    return [
+        "-c:v", "libx264", "-preset", LIVE_PRESET, "-tune", "zerolatency",
+        "-profile:v", "high", "-pix_fmt", "yuv420p",
+        "-b:v", f"{p['maxrate']}k", "-maxrate", f"{p['maxrate']}k",
+        "-bufsize", f"{p['maxrate'] * 2}k",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-c:a", "aac", "-b:a", p["audio_bitrate"], "-ar", str(p["audio_rate"]), "-ac", "2",
+    ]
+
+
+def stream_command(ffmpeg_bin, name, url, fps=FPS, threads=None):
+    """FFmpeg reading paced raw frames from stdin and the looped music bed, with no end"""
+    w, h = LAYOUTS[PROFILES[name]["layout"]]["size"]
+    cmd = [
+        ffmpeg_bin, "-hide_banner", "-loglevel", "warning",
+        "-thread_queue_size", "64",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}",
+        "-framerate", str(fps), "-i", "pipe:0",
+        "-re", "-stream_loop", "-1", "-i", BACKGROUND_MUSIC,
+        "-map", "0:v", "-map", "1:a", "-af", f"volume={MUSIC_VOLUME}",
+        "-progress", "pipe:1", "-nostats",
+        "-shortest",   # the music never ends; stop when the frames do
+    ]
+    video_filter = scale_filter(name, (w, h))
+    if video_filter:
+        cmd += ["-vf", video_filter]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    return cmd + live_output_args(name, fps) + output_format(url) + [url]
+
+
+# --- LOOKAHEAD BUFFER ---
+class FrameBuffer:
+    """Composited scenes waiting to be streamed, bounded by frames of stream time"""
+
+    def __init__(self, max_frames):
+        self.max_frames = max_frames
+        self.items = deque()
+        self.frames = 0
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def put(self, data, count, scene):
+        """Block while the buffer holds max_frames; False once closed"""
+        with self.cond:
+            while self.frames >= self.max_frames and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return False
+            self.items.append((data, count, scene))
+            self.frames += count
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Next (data, count, scene), or None if nothing arrived within timeout"""
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.frames -= item[1]
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+# --- METRICS ---
+class LiveMetrics:
+    """Counters shared by the three threads, written out like progress.Progress"""
+
+    def __init__(self, job=JOB_NAME, status_dir=STATUS_DIR, interval=UPDATE_SEC):
+        self.job = job
+        self.status_dir = status_dir
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_write = 0
+        self.frames_sent = 0
+        self.frames_rendered = 0
+        self.render_busy_sec = 0.0
+        self.underrun_frames = 0
+        self.late_frames = 0
+        self.clock_resets = 0
+        self.min_lead_sec = None
+        self.lead_sec = 0.0
+        self.puzzles_selected = 0
+        self.puzzles_rendered = 0
+        self.puzzle_id = None
+        self.restarts = 0
+        self.encoder = {}
+
+    def add(self, **counts):
+        with self.lock:
+            for key, n in counts.items():
+                setattr(self, key, getattr(self, key) + n)
+
+    def set_lead(self, lead_sec):
+        with self.lock:
+            self.lead_sec = lead_sec
+            if self.frames_sent and (self.min_lead_sec is None or lead_sec < self.min_lead_sec):
+                self.min_lead_sec = lead_sec
+
+    def encoder_update(self, info):
+        speed = info.get("speed", "").rstrip("x")
+        with self.lock:
+            self.encoder = {
+                "speed": float(speed) if speed.replace(".", "", 1).isdigit() else 0.0,
+                "bitrate": info.get("bitrate", ""),
+                "drop_frames": int(info.get("drop_frames") or 0),
+            }
+
+    def snapshot(self):
+        with self.lock:
+            now = time.time()
+            busy = self.render_busy_sec
+            render_fps = self.frames_rendered / busy if busy else 0.0
+            return {
+                "job": self.job,
+                "updated": now,
+                "uptime_sec": round(now - self.started, 1),
+                "streamed_sec": round(self.frames_sent / FPS, 1),
+                "frames_sent": self.frames_sent,
+                "frames_rendered": self.frames_rendered,
+                "render_fps": round(render_fps, 1),
+                "render_speed": round(render_fps / FPS, 1),
+                "lead_sec": round(self.lead_sec, 2),
+                "min_lead_sec": round(self.min_lead_sec or 0.0, 2),
+                "underrun_frames": self.underrun_frames,
+                "late_frames": self.late_frames,
+                "clock_resets": self.clock_resets,
+                "puzzles_selected": self.puzzles_selected,
+                "puzzles_rendered": self.puzzles_rendered,
+                "puzzle_id": self.puzzle_id,
+                "encoder_restarts": self.restarts,
+                "encoder": dict(self.encoder),
+            }
+
+    def prometheus(self, snap):
+        labels = f'job="{self.job}"'
+        gauges = [
+            ("uptime_seconds", "Seconds since the stream started", snap["uptime_sec"]),
+            ("streamed_seconds", "Seconds of video sent to FFmpeg", snap["streamed_sec"]),
+            ("lead_seconds", "Stream time rendered ahead of the wall clock", snap["lead_sec"]),
+            ("min_lead_seconds", "Lowest lead since the start", snap["min_lead_sec"]),
+            ("render_speed", "Frames rendered per second of render time, over FPS",
+             snap["render_speed"]),
+            ("underrun_frames", "Frames repeated because the buffer was empty",
+             snap["underrun_frames"]),
+            ("late_frames", "Frames written after their wall-clock slot", snap["late_frames"]),
+            ("puzzles_rendered", "Puzzles rendered since the start", snap["puzzles_rendered"]),
+            ("encoder_restarts", "FFmpeg restarts after the output failed",
+             snap["encoder_restarts"]),
+            ("encode_speed", "Encoder speed relative to real time",
+             snap["encoder"].get("speed", 0)),
+            ("last_update_timestamp_seconds", "Unix time of this snapshot", round(snap["updated"])),
+        ]
+        out = []
+        for name, help_text, value in gauges:
+            metric = f"{METRIC_PREFIX}_{name}"
+            out += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge",
+                    f"{metric}{{{labels}}} {value}"]
+        return "\n".join(out) + "\n"
+
+    def write(self, force=False):
+        """Print a status line and rewrite the status files, at most every interval"""
+        now = time.time()
+        with self.lock:
+            if not force and now - self.last_write < self.interval:
+                return
+            self.last_write = now
+        snap = self.snapshot()
+        try:
+            os.makedirs(self.status_dir, exist_ok=True)
+            base = os.path.join(self.status_dir, self.job)
+            files = (("json", json.dumps(snap, indent=2)), ("prom", self.prometheus(snap)))
+            for ext, text in files:
+                tmp = f"{base}.{ext}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    fh.write(text)
+                os.replace(tmp, f"{base}.{ext}")
+        except OSError as e:
+            print(f"[{self.job}] could not write status: {e}")
+        print(f"[{self.job}] streamed {snap['streamed_sec']:.0f}s, lead {snap['lead_sec']:.1f}s "
+              f"(min {snap['min_lead_sec']:.1f}s), render {snap['render_speed']:.0f}x real time, "
+              f"{snap['underrun_frames']} underrun frames, puzzle {snap['puzzles_rendered']}")
+
+
+# --- THREADS ---
+def pick_puzzles(out, stop, metrics, min_rating, max_rating):
+    """Picker thread: endless distinct puzzles from the pool, else the API"""
+    pool = load_pool()
+    recent = deque(maxlen=RECENT_PUZZLES)
+    while not stop.is_set():
+        try:
+            if pool is not None:
+                idx = pool.random_one(min_rating, max_rating)
+                if idx is None:
+                    raise ValueError(f"no pool puzzle rated {min_rating}-{max_rating}")
+                puzzle = pool.puzzle(idx)
+                if not annotate(puzzle):
+                    continue
+            else:
+                puzzle = fetch_puzzle(min_rating=min_rating, max_rating=max_rating)
+        except Exception as e:
+            print(f"Puzzle selection failed ({e}); retrying in {RETRY_SEC}s")
+            stop.wait(RETRY_SEC)
+            continue
+        if puzzle["id"] in recent:
+            continue
+        recent.append(puzzle["id"])
+        metrics.add(puzzles_selected=1)
+        while not stop.is_set():
+            try:
+                out.put(puzzle, timeout=1)
+                break
+            except queue.Full:
+                continue
+
+
+def live_scenes(puzzle, num):
+    """The break card announcing puzzle `num`, then its timeline"""
+    scenes = [] if num == 1 else [card_scene("Next Puzzle", f"#{num}", FPS * BREAK_SEC)]
+    return scenes + build_puzzle_timeline(
+        puzzle["fen"], puzzle["moves"], puzzle["rating"], solver_side(puzzle["fen"]),
+        message=f"Live puzzle #{num}")
+
+
+def render_ahead(puzzles, buffer, stop, metrics, layout_name):
+    """Renderer thread: composite each scene once into the lookahead buffer"""
+    num = 0
+    while not stop.is_set():
+        try:
+            puzzle = puzzles.get(timeout=1)
+        except queue.Empty:
+            continue
+        try:
+            scenes = live_scenes(puzzle, num + 1)
+        except ValueError as e:
+            print(f"Skipping puzzle {puzzle['id']}: {e}")
+            continue
+        num += 1
+        for scene in scenes:
+            started = time.perf_counter()
+            layer = None
+            if "card" not in scene:
+                layer = get_board_layer(scene["fen"], scene["last_move"])
+            data = compose_frame(layout_name, scene, layer).tobytes()
+            metrics.add(frames_rendered=scene["frames"],
+                        render_busy_sec=time.perf_counter() - started)
+            if not buffer.put(data, scene["frames"], dict(scene, puzzle_id=puzzle["id"])):
+                return
+        metrics.add(puzzles_rendered=1)
+
+
+# --- STREAMING ---
+def pace(encoder, buffer, stop, metrics, state, max_frames=None):
+    """Write one frame per 1/FPS of wall-clock time until stop, max_frames or an encoder error.
+
+    state carries the frame being repeated across encoder restarts.
+    """
+    interval = 1.0 / FPS
+    next_tick = time.perf_counter()
+    while not stop.is_set() and (max_frames is None or metrics.frames_sent < max_frames):
+        if state["remaining"] == 0:
+            item = buffer.get(timeout=0 if state["data"] else 1)
+            if item:
+                state["data"], state["remaining"], scene = item
+                metrics.puzzle_id = scene.get("puzzle_id")
+            elif state["data"]:
+                state["remaining"] = 1   # underrun: hold the last frame
+                metrics.add(underrun_frames=1)
+            else:
+                next_tick = time.perf_counter()   # nothing to show yet
+                continue
+        encoder.write(state["data"])   # raises once FFmpeg has died
+        state["remaining"] -= 1
+        metrics.add(frames_sent=1)
+        metrics.set_lead((buffer.frames + state["remaining"]) / FPS)
+        metrics.write()
+
+        next_tick += interval
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -interval:
+            metrics.add(late_frames=1)
+            if delay < -MAX_LAG_SEC:
+                metrics.add(clock_resets=1)
+                next_tick = time.perf_counter()
+
+
+def run_stream(url, name=LIVE_PROFILE, min_rating=MIN_RATING, max_rating=MAX_RATING,
+               duration_sec=None, threads=None, stop=None):
+    """Stream until stop is set or duration_sec of video has been sent; returns the metrics"""
+    ffmpeg = ffmpeg_bin()
+    stop = stop or threading.Event()
+    metrics = LiveMetrics()
+    buffer = FrameBuffer(LOOKAHEAD_SEC * FPS)
+    puzzles = queue.Queue(maxsize=LOOKAHEAD_PUZZLES)
+    workers = [
+        threading.Thread(target=pick_puzzles, args=(puzzles, stop, metrics, min_rating, max_rating),
+                         daemon=True),
+        threading.Thread(target=render_ahead,
+                         args=(puzzles, buffer, stop, metrics, PROFILES[name]["layout"]),
+                         daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    while buffer.frames < PREROLL_SEC * FPS and not stop.is_set():
+        stop.wait(0.1)
+    max_frames = int(duration_sec * FPS) if duration_sec else None
+    state = {"data": None, "remaining": 0}
+    print(f"Streaming {name} to {url} (lookahead {LOOKAHEAD_SEC}s)")
+    try:
+        while not stop.is_set() and (max_frames is None or metrics.frames_sent < max_frames):
+            cmd = stream_command(ffmpeg, name, url, threads=threads)
+            encoder = Encoder(cmd, queue_size=2,
+                              on_progress=lambda info: metrics.encoder_update(info))
+            try:
+                pace(encoder, buffer, stop, metrics, state, max_frames)
+                encoder.close()
+            except Exception as e:
+                encoder.abort()
+                metrics.add(restarts=1)
+                print(f"Stream output failed ({e}); reconnecting in {RECONNECT_SEC}s")
+                stop.wait(RECONNECT_SEC)
+            except BaseException:
+                encoder.abort()
+                raise
+    finally:
+        stop.set()
+        buffer.close()
+        for worker in workers:
+            worker.join(timeout=5)
+        metrics.write(force=True)
+    return metrics
+
+
+# --- MAIN SCRIPT ---
+def main():
+    parser = argparse.ArgumentParser(description="Stream puzzles live, forever")
+    parser.add_argument("--url", required=True,
+                        help="rtmp://, srt:// or udp:// target, or a file path for testing")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=LIVE_PROFILE,
+                        help="output profile (canvas, size, bitrate cap, audio)")
+    parser.add_argument("--min-rating", type=int, default=MIN_RATING)
+    parser.add_argument("--max-rating", type=int, default=MAX_RATING)
+    parser.add_argument("--duration", type=float,
+                        help="stop after this many seconds of video (default: never)")
+    parser.add_argument("--threads", type=int, help="FFmpeg encoder threads")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        metrics = run_stream(args.url, args.profile, args.min_rating, args.max_rating,
+                             args.duration, args.threads, stop)
+    except KeyboardInterrupt:
+        stop.set()
+        return
+    snap = metrics.snapshot()
+    print(f"Stream ended after {snap['streamed_sec']:.0f}s: {snap['puzzles_rendered']} puzzles, "
+          f"min lead {snap['min_lead_sec']:.1f}s, {snap['underrun_frames']} underrun frames")
+
+
+if __name__ == "__main__":
+    main()
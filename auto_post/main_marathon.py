@@ -1,27 +1,29 @@
 import os
-import chess
-import chess.svg
-import cairosvg
-from PIL import Image, ImageDraw, ImageFont
-import subprocess
-import requests
+import time
 import random
-import shutil
-import json
+import argparse
+import subprocess
+
+from bumpers import render_spliced
+from clip_library import compile_marathon, select_clips
+from ffmpeg_probe import ffmpeg_bin, ffprobe_bin
+from preview import write_previews
+from profiles import estimated_size, size_report
+from progressive import LIVE_DIR, PLAYLIST_NAME, playlist_status, remove_live, remux
+from progress import Progress
+from publish import prune, publish_output
+from puzzle_source import fetch_puzzles
+from renderer import FPS, build_puzzle_timeline, break_scene, render_timeline, solver_side
+from scheduler import plan_single
+from workspace import Workspace
 
 # --- CONFIGURATION ---
-FPS = 30
-COUNTDOWN_SEC = 10
-MOVE_SEC = 1
-BREAK_SEC = 3  # Break between puzzles
-TEMP_DIR = "frames"
 OUTPUT_VIDEO = "output_video/chess_long.mp4"
-FONT_PATH = "./Roboto-Regular.ttf"
-BOARD_SIZE = 800
-
-# Audio files
-BACKGROUND_MUSIC = "bg_music.mp3"
-CLICK_SOUND = "move.mp3"
+# Square for feeds plus a 16:9 cut for YouTube, from the same render pass
+OUTPUTS = {
+    "facebook_feed": OUTPUT_VIDEO,
+    "youtube": "output_video/chess_long_16x9.mp4",
+}
 
 # Puzzle themes to fetch (mix for variety)
 PUZZLE_THEMES = [
@@ -46,311 +48,219 @@ MESSAGES = [
 ]
 
 # --- UTILITY FUNCTIONS ---
-def detect_ffmpeg():
-    ffmpeg_bin = shutil.which("ffmpeg")
-    if ffmpeg_bin:
-        return ffmpeg_bin
-    local_bin = "./ffmpeg-7.0.2-amd64-static/ffmpeg"
-    if os.path.exists(local_bin):
-        os.chmod(local_bin, 0o755)
-        return local_bin
-    raise FileNotFoundError("FFmpeg not found")
-
-FFMPEG_BIN = detect_ffmpeg()
-print("Using FFmpeg:", FFMPEG_BIN)
+def build_marathon_timeline(puzzles, total_puzzles):
+    """Scenes for every puzzle plus the breaks between them"""
+    scenes = []
+    frame_count = 0
 
-def fetch_puzzles(num_puzzles=60):
-    """Fetch puzzles from various themes and randomly select the desired number"""
-    all_puzzles = []
-    
-    for theme_config in PUZZLE_THEMES:
+    for idx, puzzle_data in enumerate(puzzles[:total_puzzles], 1):
+        print(f"\nProcessing puzzle {idx}/{total_puzzles} (ID: {puzzle_data['id']})")
+        
         try:
-            # Build URL with parameters
-            base_url = "https://roynek.com/Chess_Sol_Puzzles/api/puzzles"
-            params = theme_config.copy()
-            params['limit'] = 100  # Fetch 100 per theme
+            moves = puzzle_data['moves']
             
-            # Convert params to URL string
-            param_str = "&".join([f"{k}={v}" for k, v in params.items()])
-            url = f"{base_url}?{param_str}"
+            rating = puzzle_data.get('rating', 'N/A')
             
-            print(f"Fetching from: {url}")
-            response = requests.get(url, timeout=30)
-            data = response.json()
+            # Determine side to move (solver's perspective)
+            side_to_move = solver_side(puzzle_data['fen'])
+            
+            # Random message for variety
+            message = random.choice(MESSAGES)
+            
+            # Scenes for this puzzle
+            puzzle_scenes = build_puzzle_timeline(
+                puzzle_data['fen'], moves, rating, side_to_move,
+                intro_sec=2, outro_message="Solution shown!",
+                puzzle_num=idx, total_puzzles=total_puzzles, message=message
+            )
+            
+            # Add break between puzzles (except after last puzzle)
+            if idx < total_puzzles:
+                puzzle_scenes.append(break_scene(idx, total_puzzles))
+            
+            scenes.extend(puzzle_scenes)
+            frame_count += sum(scene["frames"] for scene in puzzle_scenes)
+            print(f"  -> Total frames so far: {frame_count}")
             
-            if 'results' in data and len(data['results']) > 0:
-                all_puzzles.extend(data['results'])
-                print(f"  -> Got {len(data['results'])} puzzles")
         except Exception as e:
-            print(f"Error fetching theme {theme_config}: {e}")
+            print(f"  -> Error processing puzzle {idx}: {e}")
             continue
-    
-    # Shuffle and select random puzzles
-    random.shuffle(all_puzzles)
-    selected_puzzles = all_puzzles[:num_puzzles]
-    
-    print(f"\nTotal puzzles collected: {len(all_puzzles)}")
-    print(f"Selected for video: {len(selected_puzzles)}")
-    
-    return selected_puzzles
-
-def create_frame_image(board, last_move=None, timer=None, rating=None, 
-                       side_to_move=None, puzzle_num=None, total_puzzles=None,
-                       message=None):
-    """Create a frame image with the chess board and overlays"""
-    svg_data = chess.svg.board(
-        board,
-        size=BOARD_SIZE,
-        lastmove=last_move
-    ).encode("UTF-8")
-
-    tmp_png = os.path.join(TEMP_DIR, "tmp.png")
-    cairosvg.svg2png(bytestring=svg_data, write_to=tmp_png)
-
-    im = Image.open(tmp_png).convert("RGBA")
-    draw = ImageDraw.Draw(im)
-
-    font_large = ImageFont.truetype(FONT_PATH, 60)
-    font_medium = ImageFont.truetype(FONT_PATH, 36)
-    font_small = ImageFont.truetype(FONT_PATH, 28)
-
-    # Puzzle number
-    if puzzle_num and total_puzzles:
-        text = f"Puzzle {puzzle_num}/{total_puzzles}"
-        draw.text((20, 20), text, font=font_small, fill="yellow")
-    
-    # Rating
-    if rating:
-        draw.text((20, 55), f"Rating: {rating}", font=font_medium, fill="white")
-
-    # Side to move
-    if side_to_move:
-        draw.text((20, 95), f"{side_to_move} to move", font=font_medium, fill="white")
-    
-    # Message
-    if message:
-        draw.text((20, 135), message, font=font_small, fill="lightblue")
-
-    # Countdown timer (centered)
-    if timer is not None:
-        bbox = draw.textbbox((0, 0), str(timer), font=font_large)
-        w = bbox[2] - bbox[0]
-        h = bbox[3] - bbox[1]
-        draw.text(
-            ((BOARD_SIZE - w) // 2, (BOARD_SIZE - h) // 2),
-            str(timer),
-            font=font_large,
-            fill="white"
-        )
-
-    return im
-
-def create_break_frame(puzzle_num, total_puzzles):
-    """Create a simple break frame between puzzles"""
-    im = Image.new('RGBA', (BOARD_SIZE, BOARD_SIZE), color=(40, 40, 40, 255))
-    draw = ImageDraw.Draw(im)
-    
-    font_large = ImageFont.truetype(FONT_PATH, 70)
-    font_medium = ImageFont.truetype(FONT_PATH, 40)
-    
-    # "Next Puzzle" text
-    text1 = "Next Puzzle"
-    bbox1 = draw.textbbox((0, 0), text1, font=font_large)
-    w1 = bbox1[2] - bbox1[0]
-    draw.text(((BOARD_SIZE - w1) // 2, 300), text1, font=font_large, fill="white")
-    
-    # Puzzle number
-    text2 = f"{puzzle_num + 1}/{total_puzzles}"
-    bbox2 = draw.textbbox((0, 0), text2, font=font_medium)
-    w2 = bbox2[2] - bbox2[0]
-    draw.text(((BOARD_SIZE - w2) // 2, 400), text2, font=font_medium, fill="yellow")
-    
-    return im
-
-def save_puzzle_frames(board, moves, rating, side_to_move, puzzle_num, 
-                       total_puzzles, frame_count, message):
-    """Generate all frames for a single puzzle"""
-    
-    # Convert moves string to list if needed
-    if isinstance(moves, str):
-        moves = moves.split()
-    
-    # --- Initial position (2 seconds) ---
-    for _ in range(FPS * 2):
-        im = create_frame_image(
-            board,
-            rating=rating,
-            side_to_move=side_to_move,
-            puzzle_num=puzzle_num,
-            total_puzzles=total_puzzles,
-            message=message
-        )
-        im.save(os.path.join(TEMP_DIR, f"frame_{frame_count:06d}.png"))
-        frame_count += 1
-
-    # --- First move (the setup move) ---
-    first_move = chess.Move.from_uci(moves[0])
-    board.push(first_move)
-
-    for _ in range(FPS * MOVE_SEC):
-        im = create_frame_image(
-            board,
-            last_move=first_move,
-            rating=rating,
-            side_to_move=side_to_move,
-            puzzle_num=puzzle_num,
-            total_puzzles=total_puzzles,
-            message=message
-        )
-        im.save(os.path.join(TEMP_DIR, f"frame_{frame_count:06d}.png"))
-        frame_count += 1
-
-    # --- Countdown AFTER first move ---
-    for sec in range(COUNTDOWN_SEC, 0, -1):
-        im = create_frame_image(
-            board,
-            timer=sec,
-            rating=rating,
-            side_to_move=side_to_move,
-            puzzle_num=puzzle_num,
-            total_puzzles=total_puzzles,
-            message=message
-        )
-        for _ in range(FPS):
-            im.save(os.path.join(TEMP_DIR, f"frame_{frame_count:06d}.png"))
-            frame_count += 1
 
-    # --- Remaining moves (solution) ---
-    for move_uci in moves[1:]:
-        move = chess.Move.from_uci(move_uci)
-        board.push(move)
-        for _ in range(FPS * MOVE_SEC):
-            im = create_frame_image(
-                board,
-                last_move=move,
-                rating=rating,
-                side_to_move=side_to_move,
-                puzzle_num=puzzle_num,
-                total_puzzles=total_puzzles,
-                message=message
-            )
-            im.save(os.path.join(TEMP_DIR, f"frame_{frame_count:06d}.png"))
-            frame_count += 1
-
-    # Final pause (2 seconds)
-    for _ in range(FPS * 2):
-        im = create_frame_image(
-            board,
-            rating=rating,
-            side_to_move=side_to_move,
-            puzzle_num=puzzle_num,
-            total_puzzles=total_puzzles,
-            message="Solution shown!"
-        )
-        im.save(os.path.join(TEMP_DIR, f"frame_{frame_count:06d}.png"))
-        frame_count += 1
-    
-    return frame_count
+    return scenes, frame_count
+
+
+def compile_from_clips(dry_run=False):
+    """Build the marathon from recorded shorts, re-encoding only break cards"""
+    puzzles = select_clips(list(OUTPUTS), NUM_PUZZLES)
+    print(f"Found {len(puzzles)} puzzles with clips for {', '.join(OUTPUTS)}")
+    if not puzzles:
+        print("No recorded clips to compile; run pipeline.py with --platform "
+              f"{' --platform '.join(OUTPUTS)} first or drop --from-clips")
+        return
+    if dry_run:
+        for clips in puzzles:
+            print("  ", ", ".join(record["path"] for record in clips.values()))
+        return
+
+    FFMPEG_BIN = ffmpeg_bin()
+    FFPROBE_BIN = ffprobe_bin()
+    estimate = sum(
+        estimated_size(name, sum(clips[name]["duration"] for clips in puzzles) * 1.2)
+        for name in OUTPUTS
+    )
+    outputs = {}
+    with Workspace("compile", estimate_bytes=estimate) as ws:
+        try:
+            for name, path in OUTPUTS.items():
+                scratch = ws.path(f"{name}.mp4")
+                duration = compile_marathon(name, puzzles, scratch, ws,
+                                            FFMPEG_BIN, FFPROBE_BIN, FPS)
+                outputs[name] = publish_output(ws, scratch, path)
+        except subprocess.CalledProcessError as e:
+            print(f"\n❌ FFmpeg error: {e}")
+            return
+    size_report(outputs, duration)
+    prune()
+    print(f"\nCompiled {len(puzzles)} puzzles, {duration / 60:.1f} minutes")
 
-def save_break_frames(puzzle_num, total_puzzles, frame_count):
-    """Generate break frames between puzzles"""
-    break_im = create_break_frame(puzzle_num, total_puzzles)
-    for _ in range(FPS * BREAK_SEC):
-        break_im.save(os.path.join(TEMP_DIR, f"frame_{frame_count:06d}.png"))
-        frame_count += 1
-    return frame_count
 
 # --- MAIN SCRIPT ---
-os.makedirs(TEMP_DIR, exist_ok=True)
-os.makedirs("output_video", exist_ok=True)
-
-print("=" * 60)
-print("LONG CHESS PUZZLE VIDEO GENERATOR")
-print("=" * 60)
-
-# Fetch all puzzles
-print("\n[1/3] Fetching puzzles...")
-puzzles = fetch_puzzles(NUM_PUZZLES)
-
-if len(puzzles) < NUM_PUZZLES:
-    print(f"Warning: Only got {len(puzzles)} puzzles, expected {NUM_PUZZLES}")
-else:
-    print(f"Success: Got {len(puzzles)} puzzles!")
-
-total_puzzles = min(len(puzzles), NUM_PUZZLES)
-
-# Generate all frames
-print("\n[2/3] Generating frames for all puzzles...")
-frame_count = 0
-
-for idx, puzzle_data in enumerate(puzzles[:total_puzzles], 1):
-    print(f"\nProcessing puzzle {idx}/{total_puzzles} (ID: {puzzle_data['id']})")
-    
+def main():
+    parser = argparse.ArgumentParser(description="Render the long puzzle marathon video")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="fetch and plan the video without rendering")
+    parser.add_argument("--overlay", choices=["pil", "ass"],
+                        help="draw text per frame (pil) or burn it in from an ASS track (ass)")
+    parser.add_argument("--draft", action="store_true",
+                        help="write a low-res draft video and contact sheet to previews/ instead")
+    parser.add_argument("--sheet", action="store_true",
+                        help="write only the contact sheet to previews/ (no FFmpeg)")
+    parser.add_argument("--from-clips", action="store_true",
+                        help="stitch already-published shorts instead of rendering")
+    parser.add_argument("--progressive", action="store_true",
+                        help="write growing HLS playlists under output_video/live/ while rendering")
+    parser.add_argument("--bumpers", action="store_true",
+                        help="splice in pre-encoded break cards by stream copy instead of "
+                             "encoding them")
+    parser.add_argument("--workers", type=int,
+                        help="processes compositing frames (default: planned for this machine)")
+    args = parser.parse_args()
+    if args.bumpers and args.progressive:
+        parser.error("--bumpers joins finished MP4 segments; it cannot write a growing playlist")
+
+    os.makedirs("output_video", exist_ok=True)
+
+    if args.from_clips:
+        compile_from_clips(args.dry_run)
+        return
+
+    print("=" * 60)
+    print("LONG CHESS PUZZLE VIDEO GENERATOR")
+    print("=" * 60)
+
+    # Status files in status/marathon.{json,prom}; dry runs and previews leave them alone
+    previewing = args.dry_run or args.draft or args.sheet
+    progress = None if previewing else Progress("marathon")
+
+    # Fetch all puzzles
+    print("\n[1/3] Fetching puzzles...")
+    if progress:
+        progress.set_stage("fetch")
+    puzzles = fetch_puzzles(PUZZLE_THEMES, NUM_PUZZLES)
+
+    if len(puzzles) < NUM_PUZZLES:
+        print(f"Warning: Only got {len(puzzles)} puzzles, expected {NUM_PUZZLES}")
+    else:
+        print(f"Success: Got {len(puzzles)} puzzles!")
+
+    total_puzzles = min(len(puzzles), NUM_PUZZLES)
+
+    # Build the scene timeline for all puzzles
+    print("\n[2/3] Building timeline for all puzzles...")
+    if progress:
+        progress.set_stage("timeline")
+    scenes, frame_count = build_marathon_timeline(puzzles, total_puzzles)
+
+    if args.dry_run:
+        print(f"\nDry run: {len(scenes)} scenes, {frame_count} frames "
+              f"({frame_count / FPS / 60:.1f} min)")
+        return
+    if args.draft or args.sheet:
+        tag = f"marathon_{time.strftime('%Y%m%d-%H%M%S')}"
+        write_previews(scenes, list(OUTPUTS), tag, ffmpeg_bin() if args.draft else None)
+        return
+
+    FFMPEG_BIN = ffmpeg_bin()
+    print("Using FFmpeg:", FFMPEG_BIN)
+
+    # Render and encode every layout in one pass
+    print(f"\n[3/3] Rendering and encoding {frame_count} frames...")
+    print("Progress and ETA are written to status/marathon.json every few seconds")
+
+    # The marathon has the machine to itself: split the cores between
+    # compositing workers and the encoders' -threads
+    alloc = plan_single(len(OUTPUTS))
+    workers = args.workers or alloc.render_workers
+    print(f"Using {workers} render workers and {alloc.ffmpeg_threads} FFmpeg threads per output")
+
+    estimate = sum(estimated_size(name, frame_count / FPS) for name in OUTPUTS)
+    outputs = {}
+    live_dir = None
     try:
-        board = chess.Board(puzzle_data['fen'])
-        moves = puzzle_data['moves']
-        
-        # Convert moves string to list if needed
-        if isinstance(moves, str):
-            moves = moves.split()
-        
-        rating = puzzle_data.get('rating', 'N/A')
-        
-        # Determine side to move (solver's perspective)
-        solver_color = not board.turn
-        side_to_move = "White" if solver_color == chess.WHITE else "Black"
-        
-        # Random message for variety
-        message = random.choice(MESSAGES)
-        
-        # Generate frames for this puzzle
-        frame_count = save_puzzle_frames(
-            board, moves, rating, side_to_move,
-            idx, total_puzzles, frame_count, message
-        )
-        
-        # Add break between puzzles (except after last puzzle)
-        if idx < total_puzzles:
-            frame_count = save_break_frames(idx, total_puzzles, frame_count)
-        
-        print(f"  -> Total frames so far: {frame_count}")
-        
-    except Exception as e:
-        print(f"  -> Error processing puzzle {idx}: {e}")
-        continue
-
-# Encode video
-print(f"\n[3/3] Encoding video with {frame_count} frames...")
-print("This may take a while for a 1-hour video...")
-
-cmd = f"""
-{FFMPEG_BIN} -y -framerate {FPS} -i {TEMP_DIR}/frame_%06d.png \
--i {BACKGROUND_MUSIC} -i {CLICK_SOUND} \
--filter_complex "[1:a]volume=0.2[a1];[2:a]volume=0.5[a2];[a1][a2]amix=inputs=2:duration=longest[aout]" \
--map 0:v -map "[aout]" -c:v libx264 -pix_fmt yuv420p -preset medium -crf 23 -shortest {OUTPUT_VIDEO}
-"""
-
-try:
-    subprocess.run(cmd, shell=True, check=True)
-    print("\n✅ Video encoding complete!")
-except subprocess.CalledProcessError as e:
-    print(f"\n❌ FFmpeg error: {e}")
-
-# Cleanup
-print("\nCleaning up temporary files...")
-for f in os.listdir(TEMP_DIR):
-    os.remove(os.path.join(TEMP_DIR, f))
-os.rmdir(TEMP_DIR)
-
-# Calculate video duration
-duration_seconds = frame_count / FPS
-duration_minutes = duration_seconds / 60
-
-print("\n" + "=" * 60)
-print("GENERATION COMPLETE!")
-print("=" * 60)
-print(f"Output file: {OUTPUT_VIDEO}")
-print(f"Total puzzles: {total_puzzles}")
-print(f"Total frames: {frame_count}")
-print(f"Estimated duration: {duration_minutes:.1f} minutes ({duration_seconds:.0f} seconds)")
-print("=" * 60)
\ No newline at end of file
+        with Workspace("marathon", estimate_bytes=estimate) as ws:
+            scratch = {name: ws.path(f"{name}.mp4") for name in OUTPUTS}
+            targets = scratch
+            if args.progressive:
+                # Playlists live outside the workspace so they can be watched mid-build
+                live_dir = os.path.join(LIVE_DIR, f"marathon_{ws.job_id}")
+                targets = {name: os.path.join(live_dir, name, PLAYLIST_NAME) for name in OUTPUTS}
+                for playlist in targets.values():
+                    print("Watch while it builds:", playlist)
+            if args.bumpers:
+                render_spliced(scenes, targets, FFMPEG_BIN, ws, audio_mix=(0.2, 0.5),
+                               progress=progress, overlay_mode=args.overlay, workers=workers,
+                               threads=alloc.ffmpeg_threads)
+            else:
+                render_timeline(scenes, targets, FFMPEG_BIN, audio_mix=(0.2, 0.5),
+                                progress=progress, overlay_mode=args.overlay, workers=workers,
+                                threads=alloc.ffmpeg_threads)
+            progress.set_stage("publish")
+            if args.progressive:
+                for name, playlist in targets.items():
+                    segments, seconds, _ = playlist_status(playlist)
+                    print(f"{playlist}: {segments} segments, {seconds:.0f}s; remuxing")
+                    remux(playlist, scratch[name], FFMPEG_BIN)
+            outputs = {
+                name: publish_output(ws, scratch[name], path)
+                for name, path in OUTPUTS.items()
+            }
+        print("\n✅ Video encoding complete!")
+        size_report(outputs, frame_count / FPS)
+        prune()
+        progress.finish()
+    except subprocess.CalledProcessError as e:
+        print(f"\n❌ FFmpeg error: {e}")
+        progress.finish(ok=False, error=e)
+    except BaseException as e:
+        progress.finish(ok=False, error=e)
+        raise
+    finally:
+        if live_dir:
+            remove_live(live_dir)
+
+    # Calculate video duration
+    duration_seconds = frame_count / FPS
+    duration_minutes = duration_seconds / 60
+
+    print("\n" + "=" * 60)
+    print("GENERATION COMPLETE!")
+    print("=" * 60)
+    print(f"Output files: {', '.join(outputs.values()) or 'none'}")
+    print(f"Total puzzles: {total_puzzles}")
+    print(f"Total frames: {frame_count}")
+    print(f"Estimated duration: {duration_minutes:.1f} minutes ({duration_seconds:.0f} seconds)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Multi-board mosaic videos: 2x2 / 3x3 grids of puzzles playing at once.
+
+Every tile runs its own build_puzzle_timeline(); the timelines are merged
+into mosaic scenes that change whenever any one tile does, and tiles that
+finish early hold their final position. Board layers are rasterized at tile
+size through get_board_layer(), so each position costs one small render
+(shared with the disk cache), and a frame is built by pasting only the
+tiles whose content changed onto a persistent canvas. A four-board video
+therefore renders about as many board layers as a single puzzle.
+
+Modes:
+    race    every tile shows its rating
+    guess   ratings stay hidden ("???") until that tile's final pause
+
+    python mosaic.py --grid 4 --mode guess --platform facebook_feed --platform x
+"""
+import os
+import argparse
+
+from renderer import (BACKGROUND_COLOR, FPS, LAYOUTS, abort_encoders, build_puzzle_timeline,
+                      close_encoders, get_board_layer, get_font, open_encoders, output_layout,
+                      solver_side)
+
+# --- CONFIGURATION ---
+MOSAIC_LAYOUT = "square"
+GRIDS = {4: 2, 9: 3}       # boards -> columns
+GAP = 12                   # px between and around tiles
+LABEL_RATIO = 0.09         # label band height as a share of the tile
+TIMER_RATIO = 0.35         # countdown size as a share of the board
+HIDDEN_RATING = "???"
+OUTPUT_DIR = "output_video"
+MIN_RATING = 1000
+RATING_BANDS = [(800, 1199), (1200, 1599), (1600, 1999), (2000, 2499)]
+
+
+# --- GEOMETRY ---
+def tile_boxes(boards, layout_name=MOSAIC_LAYOUT):
+    """[(x, y, board_px, label_h)] for each tile, left to right, top to bottom"""
+    cols = GRIDS[boards]
+    cw, ch = LAYOUTS[layout_name]["size"]
+    rows = (boards + cols - 1) // cols
+    cell = min((cw - GAP * (cols + 1)) // cols, (ch - GAP * (rows + 1)) // rows)
+    label_h = int(cell * LABEL_RATIO)
+    board_px = cell - label_h
+    # Tiles are board_px wide and cell tall, centred as a block
+    x0 = (cw - cols * board_px - (cols - 1) * GAP) // 2
+    y0 = (ch - rows * cell - (rows - 1) * GAP) // 2
+    return [(x0 + (i % cols) * (board_px + GAP), y0 + (i // cols) * (cell + GAP), board_px, label_h)
+            for i in range(boards)]
+
+
+# --- TIMELINE ---
+def tile_timeline(puzzle, mode="race"):
+    """Scenes for one tile; in guess mode the rating only shows on the last one"""
+    side = solver_side(puzzle['fen'])
+    rating = None if mode == "guess" else puzzle['rating']
+    scenes = build_puzzle_timeline(puzzle['fen'], puzzle['moves'], rating, side)
+    if mode == "guess":
+        scenes[-1]["overlay"] = dict(scenes[-1]["overlay"], rating=puzzle['rating'])
+    return scenes
+
+
+def merge_timelines(timelines):
+    """Mosaic scenes {"tiles": [scene per tile], "frames": n} covering every timeline.
+
+    A new mosaic scene starts wherever any tile changes scene; a tile whose
+    timeline has ended keeps showing its last scene.
+    """
+    ends = []
+    for scenes in timelines:
+        t, bounds = 0, []
+        for scene in scenes:
+            t += scene["frames"]
+            bounds.append(t)
+        ends.append(bounds)
+    cuts = sorted({t for bounds in ends for t in bounds})
+
+    merged, pos, start = [], [0] * len(timelines), 0
+    for cut in cuts:
+        for i, bounds in enumerate(ends):
+            while pos[i] < len(bounds) - 1 and bounds[pos[i]] <= start:
+                pos[i] += 1
+        merged.append({"tiles": [timelines[i][pos[i]] for i in range(len(timelines))],
+                       "frames": cut - start})
+        start = cut
+    return merged
+
+
+# --- DRAWING ---
+def _tile_key(num, scene):
+    overlay = scene["overlay"]
+    return (scene["fen"], scene["last_move"], overlay.get("rating"), overlay.get("timer"), num)
+
+
+def draw_tile(canvas, box, num, scene):
+    """Paint one tile (label band + board + countdown) onto the canvas in place"""
+    from PIL import ImageDraw
+
+    x, y, board_px, label_h = box
+    overlay = scene["overlay"]
+    draw = ImageDraw.Draw(canvas)
+    draw.rectangle((x, y, x + board_px - 1, y + label_h - 1), fill=BACKGROUND_COLOR)
+    font = get_font(max(10, int(label_h * 0.62)))
+    text_y = y + (label_h - font.size) // 2
+    draw.text((x + 4, text_y), f"#{num} {overlay.get('side_to_move') or ''}".rstrip(),
+              font=font, fill="white")
+    rating = overlay.get("rating")
+    rating_text = HIDDEN_RATING if rating is None else str(rating)
+    draw.text((x + board_px - 4 - draw.textlength(rating_text, font=font), text_y), rating_text,
+              font=font, fill="yellow")
+
+    canvas.paste(get_board_layer(scene["fen"], scene["last_move"], size=board_px), (x, y + label_h))
+    timer = overlay.get("timer")
+    if timer is not None:
+        font = get_font(int(board_px * TIMER_RATIO))
+        bbox = draw.textbbox((0, 0), str(timer), font=font)
+        cx, cy = x + board_px // 2, y + label_h + board_px // 2
+        tx = cx - (bbox[2] - bbox[0]) // 2 - bbox[0]
+        ty = cy - (bbox[3] - bbox[1]) // 2 - bbox[1]
+        draw.text((tx, ty), str(timer), font=font, fill="white",
+                  stroke_width=max(2, board_px // 100), stroke_fill="black")
+
+
+class MosaicCanvas:
+    """Persistent canvas that repaints only the tiles whose content changed"""
+
+    def __init__(self, boards, layout_name=MOSAIC_LAYOUT):
+        from PIL import Image
+
+        self.boxes = tile_boxes(boards, layout_name)
+        self.image = Image.new("RGB", LAYOUTS[layout_name]["size"], BACKGROUND_COLOR)
+        self.keys = [None] * boards
+        self.repaints = 0
+
+    def update(self, tiles):
+        for i, (box, scene) in enumerate(zip(self.boxes, tiles)):
+            key = _tile_key(i + 1, scene)
+            if key != self.keys[i]:
+                draw_tile(self.image, box, i + 1, scene)
+                self.keys[i] = key
+                self.repaints += 1
+        return self.image
+
+
+def render_mosaic(timelines, outputs, ffmpeg_bin, progress=None):
+    """Encode merged tile timelines to {profile_or_layout: path}; returns frames written.
+
+    Every output must be cut from the square layout.
+    """
+    wrong = [name for name in outputs if output_layout(name) != MOSAIC_LAYOUT]
+    if wrong:
+        raise ValueError(f"Mosaic outputs must use the {MOSAIC_LAYOUT} layout: {wrong}")
+    if len(timelines) not in GRIDS:
+        raise ValueError(f"Mosaics hold {sorted(GRIDS)} boards, not {len(timelines)}")
+
+    scenes = merge_timelines(timelines)
+    canvas = MosaicCanvas(len(timelines))
+    encoders, ass_files, _ = open_encoders(scenes, outputs, ffmpeg_bin, progress=progress,
+                                           overlay_mode="pil")
+    frame_count = 0
+    try:
+        for scene in scenes:
+            data = canvas.update(scene["tiles"]).tobytes()
+            for _, encoder in encoders.values():
+                encoder.write(data, scene["frames"])
+            frame_count += scene["frames"]
+            if progress:
+                progress.frames_done(frame_count)
+    except BaseException:
+        abort_encoders(encoders, ass_files)
+        raise
+    close_encoders(encoders, ass_files)
+    print(f"Mosaic: {len(scenes)} frames composited, {canvas.repaints} tile repaints")
+    return frame_count
+
+
+# --- PUZZLES ---
+def fetch_mosaic_puzzles(boards, mode, min_rating=MIN_RATING):
+    """Distinct puzzles for the grid; guess mode spreads them over RATING_BANDS"""
+    from puzzle_source import fetch_puzzle
+
+    puzzles, seen = [], set()
+    attempts = 0
+    while len(puzzles) < boards:
+        attempts += 1
+        if attempts > boards * 4:
+            raise RuntimeError(
+                f"Only found {len(puzzles)} distinct puzzles for a {boards}-board mosaic")
+        if mode == "guess":
+            lo, hi = RATING_BANDS[len(puzzles) % len(RATING_BANDS)]
+            puzzle = fetch_puzzle(min_rating=lo, max_rating=hi)
+        else:
+            puzzle = fetch_puzzle(min_rating=min_rating)
+        if puzzle['id'] not in seen:
+            seen.add(puzzle['id'])
+            puzzles.append(puzzle)
+    return puzzles
+
+
+# --- MAIN SCRIPT ---
+def main():
+    from ffmpeg_probe import ffmpeg_bin
+    from profiles import PROFILES, estimated_size
+    from publish import publish_output
+    from workspace import Workspace
+
+    parser = argparse.ArgumentParser(description="Render a grid of puzzles playing at once")
+    parser.add_argument("--grid", type=int, choices=sorted(GRIDS), default=4,
+                        help="number of boards")
+    parser.add_argument("--mode", choices=["race", "guess"], default="race")
+    parser.add_argument("--platform", action="append", dest="profiles",
+                        help="square-layout output profile, repeatable (default: facebook_feed)")
+    parser.add_argument("--min-rating", type=int, default=MIN_RATING)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="fetch and plan the video without rendering")
+    args = parser.parse_args()
+
+    profiles = args.profiles or ["facebook_feed"]
+    unknown = [p for p in profiles if output_layout(p) != MOSAIC_LAYOUT or p not in PROFILES]
+    if unknown:
+        parser.error(f"{unknown} are not square-layout profiles")
+
+    puzzles = fetch_mosaic_puzzles(args.grid, args.mode, args.min_rating)
+    for puzzle in puzzles:
+        print(f"  {puzzle['id']} ({puzzle['rating']})")
+    timelines = [tile_timeline(puzzle, args.mode) for puzzle in puzzles]
+    scenes = merge_timelines(timelines)
+    frames = sum(scene["frames"] for scene in scenes)
+    if args.dry_run:
+        print(f"Dry run: {len(scenes)} mosaic scenes, {frames} frames ({frames / FPS:.1f}s)")
+        return
+
+    tag = f"mosaic_{args.mode}{args.grid}"
+    estimate = sum(estimated_size(p, frames / FPS) for p in profiles)
+    with Workspace("mosaic", estimate_bytes=estimate) as ws:
+        scratch = {p: ws.path(f"{p}.mp4") for p in profiles}
+        render_mosaic(timelines, scratch, ffmpeg_bin())
+        outputs = {p: publish_output(ws, path, os.path.join(OUTPUT_DIR, f"{tag}_{p}.mp4"))
+                   for p, path in scratch.items()}
+    for path in outputs.values():
+        print("✅", path)
+
+
+if __name__ == "__main__":
+    main()
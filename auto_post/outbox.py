@@ -0,0 +1,307 @@
+"""Durable outbox for social media posts.
+
+Render scripts call enqueue_post() and start_worker() instead of posting
+inline, so they can finish (and clean up) immediately. The outbox is an
+append-only JSONL log under OUTBOX_DIR; the latest record for an
+idempotency key is its current state. A detached worker (this file run as a
+script, or from cron) drains it with concurrent per-platform sends, bounded
+timeouts and exponential backoff.
+
+    python outbox.py            # drain until nothing is due or retrying
+    python outbox.py --status   # print a summary of the outbox
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import fcntl
+import subprocess
+from contextlib import contextmanager
+
+# --- CONFIGURATION ---
+SOCIAL_API_BASE = "https://roynek.com/alltrenders/codes/python_API/social-media/"
+OUTBOX_DIR = "outbox"
+OUTBOX_FILE = os.path.join(OUTBOX_DIR, "posts.jsonl")
+APPEND_LOCK = os.path.join(OUTBOX_DIR, "posts.lock")
+WORKER_LOCK = os.path.join(OUTBOX_DIR, "worker.lock")
+WORKER_LOG = os.path.join(OUTBOX_DIR, "worker.log")
+
+CONNECT_TIMEOUT = 10      # seconds to establish the connection
+READ_TIMEOUT = 120        # seconds to wait for the social API to answer
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SEC = 30     # 30s, 60s, 120s, ... capped at BACKOFF_MAX_SEC
+BACKOFF_MAX_SEC = 3600
+POLL_SEC = 15             # how often a waiting worker re-checks for new posts
+
+# HTTP statuses worth retrying; any other 4xx is treated as permanent
+RETRYABLE_STATUS = {408, 425, 429}
+
+PENDING, RETRY, SENT, FAILED = "pending", "retry", "sent", "failed"
+
+
+# --- UTILITY FUNCTIONS ---
+@contextmanager
+def _locked(path, blocking=True):
+    """Hold an exclusive flock on path; yields False if non-blocking and busy"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as fh:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fh, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _write_record(record):
+    """Append one state record; the caller holds APPEND_LOCK"""
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with open(OUTBOX_FILE, "a", encoding="utf-8") as fh:
+        fh.write(line)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _append(record):
+    """Append one state record to the outbox log"""
+    with _locked(APPEND_LOCK):
+        _write_record(record)
+
+
+def load_outbox():
+    """Fold the log into {key: latest record}, skipping torn lines"""
+    entries = {}
+    if not os.path.exists(OUTBOX_FILE):
+        return entries
+    with open(OUTBOX_FILE, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            entries[record["key"]] = record
+    return entries
+
+
+def compact_outbox():
+    """Rewrite the log keeping only the latest record per key"""
+    with _locked(APPEND_LOCK):
+        entries = load_outbox()
+        tmp = OUTBOX_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for record in entries.values():
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, OUTBOX_FILE)
+
+
+def build_payload(link, text, media=None, area=None, x_comm_id=None, fb_post_to=None):
+    return {
+        'link_2_post': link,
+        'message': text,
+        'media': media,
+        'pages_ordered_ids': area,
+        'comm_id': x_comm_id,
+        'post_to': fb_post_to
+    }
+
+
+def idempotency_key(platform, payload, day=None):
+    """Stable key for a post: same platform, target, media and day => same key.
+
+    The message text is left out on purpose because it is randomised per
+    run; re-running a job must not double post, while re-posting a popular
+    puzzle on a later day is still allowed.
+    """
+    ident = {k: v for k, v in payload.items() if k != 'message'}
+    day = day or time.strftime("%Y-%m-%d", time.gmtime())
+    raw = json.dumps([platform, day, ident], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def send_to_social_media_api(platform, link, text, media=None, area=None, x_comm_id=None,
+                             fb_post_to=None, key=None):
+    """Post synchronously with bounded timeouts; returns the response text or None"""
+    payload = build_payload(link, text, media, area, x_comm_id, fb_post_to)
+    try:
+        return _post(platform, payload, key)
+    except Exception as e:
+        print('Social Media Error:', str(e))
+        return None
+
+
+def _post(platform, payload, key=None):
+    """Single HTTP attempt; raises on network errors and HTTP error statuses"""
+    import requests
+
+    headers = {'Content-Type': 'application/json'}
+    if key:
+        headers['Idempotency-Key'] = key
+    response = requests.post(
+        SOCIAL_API_BASE + platform,
+        json=payload,
+        headers=headers,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+    )
+    response.raise_for_status()
+    return response.text
+
+
+def _is_retryable(exc):
+    response = getattr(exc, "response", None)
+    if response is None:
+        return True  # timeouts, DNS and connection errors
+    return response.status_code >= 500 or response.status_code in RETRYABLE_STATUS
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with +/-20% jitter for the given attempt count"""
+    delay = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# --- PRODUCER SIDE ---
+def enqueue_post(platform, link, text, media=None, area=None, x_comm_id=None, fb_post_to=None):
+    """Durably queue a post; returns its idempotency key.
+
+    Re-queueing a post that is already pending or sent is a no-op.
+    """
+    payload = build_payload(link, text, media, area, x_comm_id, fb_post_to)
+    key = idempotency_key(platform, payload)
+    # Check and append under one lock so concurrent producers can't both queue it
+    with _locked(APPEND_LOCK):
+        existing = load_outbox().get(key)
+        if existing and existing["status"] in (PENDING, RETRY, SENT):
+            print(f"Outbox: {platform} post {key} already {existing['status']}, not re-queued")
+            return key
+        _write_record({
+            "key": key,
+            "platform": platform,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "next_at": 0,
+            "queued_at": time.time(),
+        })
+    print(f"Outbox: queued {platform} post {key}")
+    return key
+
+
+def start_worker():
+    """Spawn a detached outbox worker so the caller can exit right away"""
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    log = open(WORKER_LOG, "a")
+    subprocess.Popen(
+        [sys.executable, "-u", os.path.abspath(__file__)],
+        cwd=os.getcwd(),
+        stdin=subprocess.DEVNULL,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+    log.close()
+
+
+# --- WORKER SIDE ---
+# asyncio is only needed by the worker, so it is imported there rather than
+# slowing down every render script that merely enqueues
+async def _send_entry(entry):
+    import asyncio
+
+    key, platform = entry["key"], entry["platform"]
+    attempts = entry["attempts"] + 1
+    record = dict(entry, attempts=attempts, last_try=time.time())
+    try:
+        text = await asyncio.wait_for(
+            asyncio.to_thread(_post, platform, entry["payload"], key),
+            timeout=CONNECT_TIMEOUT + READ_TIMEOUT + 5
+        )
+        record.update(status=SENT, response=text[:500], error=None)
+        print(f"[{platform}] {key} sent (attempt {attempts})")
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        if attempts >= MAX_ATTEMPTS or not _is_retryable(e):
+            record.update(status=FAILED, error=error)
+            print(f"[{platform}] {key} FAILED permanently: {error}")
+        else:
+            delay = backoff_delay(attempts)
+            record.update(status=RETRY, error=error, next_at=time.time() + delay)
+            print(f"[{platform}] {key} attempt {attempts} failed ({error}), retry in {delay:.0f}s")
+    _append(record)
+
+
+async def _drain_platform(entries):
+    # Posts to one platform go out in order; platforms run concurrently
+    for entry in entries:
+        await _send_entry(entry)
+
+
+async def drain_once():
+    """Send every due entry once; returns seconds until the next retry or None"""
+    now = time.time()
+    by_platform = {}
+    next_due = None
+    for entry in load_outbox().values():
+        if entry["status"] not in (PENDING, RETRY):
+            continue
+        if entry["next_at"] <= now:
+            by_platform.setdefault(entry["platform"], []).append(entry)
+        else:
+            wait = entry["next_at"] - now
+            next_due = wait if next_due is None else min(next_due, wait)
+    if by_platform:
+        import asyncio
+        await asyncio.gather(*(_drain_platform(e) for e in by_platform.values()))
+        # New retries may have been scheduled by this pass
+        return await _next_retry_in()
+    return next_due
+
+
+async def _next_retry_in():
+    now = time.time()
+    waits = [max(0, e["next_at"] - now) for e in load_outbox().values()
+             if e["status"] in (PENDING, RETRY)]
+    return min(waits) if waits else None
+
+
+def run_worker():
+    """Drain the outbox until nothing is left to send.
+
+    Workers serialise on WORKER_LOCK: a worker started while another one is
+    draining waits for it and then sends whatever was queued meanwhile.
+    """
+    import asyncio
+
+    with _locked(WORKER_LOCK):
+        while True:
+            wait = asyncio.run(drain_once())
+            if wait is None:
+                break
+            time.sleep(min(POLL_SEC, max(1, wait)))
+        compact_outbox()
+
+
+def print_status():
+    counts = {}
+    for entry in load_outbox().values():
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        if entry["status"] == FAILED:
+            print(f"FAILED {entry['platform']} {entry['key']}: {entry.get('error')}")
+    print("Outbox:", counts or "empty")
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        print_status()
+    else:
+        run_worker()
@@ -0,0 +1,232 @@
+"""Staged pipeline runner: fetch, render and post overlap across jobs.
+
+Stages are connected by bounded queues and each runs in its own worker
+threads, so for a batch of shorts puzzle N+1 is fetched and validated
+while puzzle N renders and encodes and puzzle N-1 is published and
+queued for posting. The bounded queues keep a fast stage from running far
+ahead of a slow one.
+
+Every stage records time spent working, waiting for input (starved) and
+waiting for room downstream (blocked); report() prints these as shares of
+the wall-clock time, so the bottleneck is the stage that is busy while the
+others starve.
+
+    python pipeline.py --count 6 --platform facebook_reels --platform x --post
+
+With --schedule, render concurrency, compositing workers and FFmpeg
+-threads come from a scheduler.Scheduler instead of --render-workers.
+"""
+import os
+import time
+import queue
+import argparse
+import threading
+
+# --- CONFIGURATION ---
+QUEUE_SIZE = 2          # items buffered between two stages
+OUTPUT_DIR = "output_video"
+
+_DONE = object()
+
+
+class Stage:
+    """fn(item) -> item for the next stage; returning None drops the item"""
+
+    def __init__(self, name, fn, workers=1, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.items = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def add(self, **times):
+        with self.lock:
+            for key, value in times.items():
+                setattr(self, key, getattr(self, key) + value)
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+        self.errors = []
+        self.wall = 0.0
+
+    def run(self, source):
+        """Push every item of source through the stages; returns the last stage's outputs"""
+        inboxes = [queue.Queue(maxsize=s.queue_size) for s in self.stages]
+        remaining = [s.workers for s in self.stages]
+        results = []
+        lock = threading.Lock()
+
+        def worker(idx):
+            stage = self.stages[idx]
+            inbox = inboxes[idx]
+            outbox = inboxes[idx + 1] if idx + 1 < len(inboxes) else None
+            while True:
+                t0 = time.perf_counter()
+                item = inbox.get()
+                t1 = time.perf_counter()
+                stage.add(starved=t1 - t0)
+                if item is _DONE:
+                    break
+                try:
+                    out = stage.fn(item)
+                except Exception as e:
+                    stage.add(busy=time.perf_counter() - t1, failed=1)
+                    with lock:
+                        self.errors.append((stage.name, item, e))
+                    print(f"[{stage.name}] failed: {e}")
+                    continue
+                t2 = time.perf_counter()
+                stage.add(busy=t2 - t1, items=1)
+                if out is None:
+                    continue
+                if outbox is None:
+                    with lock:
+                        results.append(out)
+                else:
+                    outbox.put(out)
+                    stage.add(blocked=time.perf_counter() - t2)
+
+            # The last worker of a stage to finish closes the next stage
+            with lock:
+                remaining[idx] -= 1
+                last = remaining[idx] == 0
+            if last and outbox is not None:
+                for _ in range(self.stages[idx + 1].workers):
+                    outbox.put(_DONE)
+
+        threads = [threading.Thread(target=worker, args=(idx,), name=f"{stage.name}-{n}",
+                                    daemon=True)
+                   for idx, stage in enumerate(self.stages) for n in range(stage.workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for item in source:
+            inboxes[0].put(item)
+        for _ in range(self.stages[0].workers):
+            inboxes[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        self.wall = time.perf_counter() - start
+        return results
+
+    def report(self):
+        """Per-stage utilization table; returns the name of the busiest stage"""
+        print(f"\n{'stage':<10} {'workers':>7} {'items':>6} {'failed':>6} "
+              f"{'busy%':>6} {'starved%':>9} {'blocked%':>9}")
+        busiest, best = None, -1.0
+        for stage in self.stages:
+            capacity = self.wall * stage.workers or 1
+            busy = 100 * stage.busy / capacity
+            print(f"{stage.name:<10} {stage.workers:>7} {stage.items:>6} {stage.failed:>6} "
+                  f"{busy:>6.1f} {100 * stage.starved / capacity:>9.1f} "
+                  f"{100 * stage.blocked / capacity:>9.1f}")
+            if busy > best:
+                busiest, best = stage.name, busy
+        print(f"Wall time {self.wall:.1f}s; bottleneck: {busiest}")
+        return busiest
+
+
+# --- SHORTS BATCH ---
+def shorts_pipeline(profiles, min_rating=1000, post=False, render_workers=1, scheduler=None):
+    """fetch -> render (encode + publish) -> post, for a batch of random shorts.
+
+    A scheduler, if given, gates the render stage and sizes each job.
+    """
+    from clip_library import record_clip
+    from covers import write_covers
+    from ffmpeg_probe import ffmpeg_bin
+    from profiles import estimated_size
+    from publish import publish_output
+    from puzzle_source import fetch_puzzle
+    from renderer import FPS, build_puzzle_timeline, render_timeline, solver_side
+    from social import post_outputs
+    from workspace import Workspace
+
+    ffmpeg = ffmpeg_bin()
+
+    def fetch(_):
+        data = fetch_puzzle(min_rating=min_rating)
+        side = solver_side(data['fen'])
+        scenes = build_puzzle_timeline(data['fen'], data['moves'], data['rating'], side)
+        print(f"[fetch] {data['id']} ({data['rating']}), {len(scenes)} scenes")
+        return {"data": data, "side": side, "scenes": scenes}
+
+    def render(job):
+        data = job["data"]
+        duration_sec = sum(scene["frames"] for scene in job["scenes"]) / FPS
+        estimate = sum(estimated_size(p, duration_sec) for p in profiles)
+        with Workspace("batch", estimate_bytes=estimate) as ws:
+            scratch = {profile: ws.path(f"{profile}.mp4") for profile in profiles}
+            if scheduler:
+                with scheduler.job(len(profiles)) as alloc:
+                    frame_count = render_timeline(job["scenes"], scratch, ffmpeg,
+                                                  workers=alloc.render_workers,
+                                                  threads=alloc.ffmpeg_threads)
+                    alloc.frames = frame_count * len(profiles)
+            else:
+                frame_count = render_timeline(job["scenes"], scratch, ffmpeg)
+            job["outputs"] = {
+                profile: publish_output(ws, path,
+                                        os.path.join(OUTPUT_DIR, f"{data['id']}_{profile}.mp4"))
+                for profile, path in scratch.items()
+            }
+        for profile, path in job["outputs"].items():
+            record_clip(data, profile, path, frame_count / FPS)
+        job["covers"] = write_covers(job["scenes"], data['id'], profiles)
+        del job["scenes"]
+        print(f"[render] {data['id']} -> {', '.join(job['outputs'].values())}")
+        return job
+
+    def publish(job):
+        if post:
+            post_outputs(job["data"], job["side"], job["outputs"])
+        return job
+
+    return Pipeline([
+        Stage("fetch", fetch),
+        Stage("render", render, workers=scheduler.max_jobs if scheduler else render_workers),
+        Stage("post", publish),
+    ])
+
+
+# --- MAIN SCRIPT ---
+def main():
+    from profiles import PROFILES
+
+    parser = argparse.ArgumentParser(description="Render a batch of shorts with overlapping stages")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--platform", action="append", dest="profiles",
+                        help="output profile, repeatable (default: facebook_feed)")
+    parser.add_argument("--min-rating", type=int, default=1000)
+    parser.add_argument("--render-workers", type=int, default=1)
+    parser.add_argument("--post", action="store_true", help="queue social posts for each short")
+    parser.add_argument("--schedule", action="store_true",
+                        help="size render concurrency and FFmpeg threads to this machine")
+    args = parser.parse_args()
+
+    profiles = args.profiles or ["facebook_feed"]
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s) {unknown}; choose from {list(PROFILES)}")
+
+    scheduler = None
+    if args.schedule:
+        from scheduler import Scheduler
+        scheduler = Scheduler(outputs_per_job=len(profiles))
+    pipeline = shorts_pipeline(profiles, args.min_rating, args.post, args.render_workers, scheduler)
+    results = pipeline.run(range(args.count))
+    pipeline.report()
+    if scheduler:
+        scheduler.report()
+    print(f"{len(results)}/{args.count} shorts done, {len(pipeline.errors)} failed")
+
+
+if __name__ == "__main__":
+    main()
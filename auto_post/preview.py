@@ -0,0 +1,168 @@
+"""Draft videos and contact sheets for checking content before it posts.
+
+Both work from the exact scene timeline the final render would use, so the
+scripts' --draft / --sheet flags preview the same puzzle selection:
+
+    render_draft()   DRAFT_SCALE size, DRAFT_FPS, ultrafast x264; one file
+                     per layout. Boards are rasterized and composited at
+                     the draft size, so a cold cache costs a fraction of
+                     a real render.
+    contact_sheet()  one PNG per puzzle with every position of the line,
+                     no FFmpeg involved at all.
+
+Board layers go through get_board_layer(), so sheets and drafts reuse
+cached boards of their own sizes across runs.
+"""
+import os
+
+from renderer import (BACKGROUND_COLOR, BOARD_SIZE, FPS, LAYOUTS, Encoder, compose_frame,
+                      encoder_command, get_board_layer, get_font, output_layout)
+
+# --- CONFIGURATION ---
+PREVIEW_DIR = "previews"
+DRAFT_SCALE = 1 / 3
+DRAFT_FPS = 10
+DRAFT_OUTPUT_ARGS = [
+    "-c:v", "libx264", "-preset", "ultrafast", "-crf", "30", "-pix_fmt", "yuv420p",
+    "-c:a", "aac", "-b:a", "64k",
+]
+SHEET_COLUMNS = 4
+SHEET_THUMB = 270          # board thumbnail size in the contact sheet
+SHEET_LABEL_PX = 22
+
+
+# --- DRAFT VIDEO ---
+def draft_size(size, scale=DRAFT_SCALE):
+    """Scaled canvas size, rounded to even numbers for yuv420p"""
+    return tuple(max(2, int(round(d * scale / 2)) * 2) for d in size)
+
+
+def render_draft(scenes, outputs, ffmpeg_bin, audio_mix=(0.3, 0.7)):
+    """Quick low-res render of {profile_or_layout: path}; one encode per layout.
+
+    Returns {layout: path} of what was written.
+    """
+    by_layout = {}
+    for name, path in outputs.items():
+        by_layout.setdefault(output_layout(name), path)
+
+    frame_counts = [max(1, round(scene["frames"] * DRAFT_FPS / FPS)) for scene in scenes]
+    board_px = int(round(BOARD_SIZE * DRAFT_SCALE))
+    duration_sec = sum(frame_counts) / DRAFT_FPS
+    encoders = {}
+    for layout_name, path in by_layout.items():
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        size = draft_size(LAYOUTS[layout_name]["size"])
+        cmd = encoder_command(ffmpeg_bin, size, path, duration_sec, audio_mix,
+                              DRAFT_OUTPUT_ARGS, fps=DRAFT_FPS)
+        encoders[layout_name] = (size, Encoder(cmd))
+
+    try:
+        for scene, count in zip(scenes, frame_counts):
+            layer = None
+            if "card" not in scene:
+                layer = get_board_layer(scene["fen"], scene["last_move"], size=board_px)
+            for layout_name, (size, encoder) in encoders.items():
+                frame = compose_frame(layout_name, scene, layer, size=size)
+                encoder.write(frame.tobytes(), count)
+    except BaseException:
+        for _, encoder in encoders.values():
+            encoder.abort()
+        raise
+    for _, encoder in encoders.values():
+        encoder.close()
+    return by_layout
+
+
+# --- CONTACT SHEETS ---
+def line_positions(scenes):
+    """One board scene per position, in timeline order.
+
+    Countdown ticks and the final pause repeat a position without its last
+    move; they are folded into the scene that played the move.
+    """
+    positions = []
+    for scene in scenes:
+        if "card" in scene:
+            continue
+        if positions and positions[-1]["fen"] == scene["fen"]:
+            if scene["last_move"] and not positions[-1]["last_move"]:
+                positions[-1] = scene
+            continue
+        positions.append(scene)
+    return positions
+
+
+def contact_sheet(scenes, path, title=""):
+    """PNG grid of every position in scenes, labelled with the move played"""
+    from PIL import Image, ImageDraw
+
+    positions = line_positions(scenes)
+    if not positions:
+        return None
+    font = get_font(SHEET_LABEL_PX)
+    label_h = int(SHEET_LABEL_PX * 1.6)
+    header_h = label_h if title else 0
+    cols = min(SHEET_COLUMNS, len(positions))
+    rows = (len(positions) + cols - 1) // cols
+    sheet = Image.new("RGB", (cols * SHEET_THUMB, header_h + rows * (SHEET_THUMB + label_h)),
+                      BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(sheet)
+    if title:
+        draw.text((8, 6), title, font=font, fill="yellow")
+
+    for idx, scene in enumerate(positions):
+        x = (idx % cols) * SHEET_THUMB
+        y = header_h + (idx // cols) * (SHEET_THUMB + label_h)
+        sheet.paste(get_board_layer(scene["fen"], scene["last_move"], size=SHEET_THUMB), (x, y))
+        label = f"{idx}. {scene['last_move']}" if scene["last_move"] else "start"
+        draw.text((x + 8, y + SHEET_THUMB + 4), label, font=font, fill="white")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    sheet.save(path)
+    return path
+
+
+def _title(scene):
+    overlay = scene.get("overlay") or {}
+    parts = []
+    if overlay.get("puzzle_num"):
+        parts.append(f"Puzzle {overlay['puzzle_num']}/{overlay.get('total_puzzles')}")
+    if overlay.get("rating") is not None:
+        parts.append(f"Rating {overlay['rating']}")
+    if overlay.get("side_to_move"):
+        parts.append(f"{overlay['side_to_move']} to move")
+    return " | ".join(parts)
+
+
+def puzzle_sheets(scenes, tag, out_dir=PREVIEW_DIR):
+    """One contact sheet per puzzle in a timeline (marathons hold many)"""
+    groups, order = {}, []
+    for scene in scenes:
+        if "card" in scene:
+            continue
+        num = scene["overlay"].get("puzzle_num") or 1
+        if num not in groups:
+            groups[num] = []
+            order.append(num)
+        groups[num].append(scene)
+    paths = []
+    for num in order:
+        name = f"{tag}.png" if len(order) == 1 else f"{tag}_{num:02d}.png"
+        path = contact_sheet(groups[num], os.path.join(out_dir, name), _title(groups[num][0]))
+        if path:
+            paths.append(path)
+    return paths
+
+
+def write_previews(scenes, names, tag, ffmpeg_bin=None, out_dir=PREVIEW_DIR):
+    """Contact sheets, plus draft videos for the named outputs when ffmpeg_bin is given"""
+    paths = puzzle_sheets(scenes, tag, out_dir)
+    if ffmpeg_bin:
+        outputs = {name: os.path.join(out_dir, f"{tag}_{output_layout(name)}.mp4")
+                   for name in names}
+        paths += list(render_draft(scenes, outputs, ffmpeg_bin).values())
+    print("Previews:")
+    for path in paths:
+        print("  ", path)
+    return paths
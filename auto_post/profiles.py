@@ -0,0 +1,88 @@
+"""Per-platform output profiles.
+
+Each profile encodes straight to what the platform asks for (resolution,
+bitrate cap, keyframe cadence, AAC settings, moov atom up front) so uploads
+are small and the platform can publish them without a full re-transcode.
+"""
+import os
+
+# --- CONFIGURATION ---
+# layout:      renderer canvas the profile is cut from
+# size:        output resolution (scaled from the canvas when it differs)
+# maxrate:     VBV cap in kbit/s; bufsize is twice that
+# gop_sec:     keyframe interval; closed_gop for platforms that require it
+PROFILES = {
+    "facebook_feed": {
+        "layout": "square", "size": (1080, 1080), "crf": 21, "maxrate": 6000,
+        "preset": "medium", "gop_sec": 2, "closed_gop": False,
+        "audio_bitrate": "128k", "audio_rate": 48000,
+    },
+    "facebook_reels": {
+        "layout": "reels", "size": (1080, 1920), "crf": 21, "maxrate": 8000,
+        "preset": "medium", "gop_sec": 2, "closed_gop": False,
+        "audio_bitrate": "128k", "audio_rate": 48000,
+    },
+    "x": {
+        "layout": "square", "size": (720, 720), "crf": 23, "maxrate": 5000,
+        "preset": "medium", "gop_sec": 1, "closed_gop": False,
+        "audio_bitrate": "128k", "audio_rate": 44100,
+    },
+    "youtube": {
+        "layout": "landscape", "size": (1920, 1080), "crf": 20, "maxrate": 8000,
+        "preset": "medium", "gop_sec": 0.5, "closed_gop": True,
+        "audio_bitrate": "384k", "audio_rate": 48000,
+    },
+    "youtube_shorts": {
+        "layout": "reels", "size": (1080, 1920), "crf": 20, "maxrate": 8000,
+        "preset": "medium", "gop_sec": 0.5, "closed_gop": True,
+        "audio_bitrate": "256k", "audio_rate": 48000,
+    },
+}
+
+
+def output_args(name, fps):
+    """FFmpeg output options for a profile (everything after the inputs)"""
+    p = PROFILES[name]
+    gop = max(1, int(round(fps * p["gop_sec"])))
+    args = [
+        "-c:v", "libx264", "-preset", p["preset"], "-tune", "stillimage",
+        "-profile:v", "high", "-pix_fmt", "yuv420p",
+        "-crf", str(p["crf"]),
+        "-maxrate", f"{p['maxrate']}k", "-bufsize", f"{p['maxrate'] * 2}k",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-bf", "2",
+    ]
+    if p["closed_gop"]:
+        args += ["-flags", "+cgop"]
+    args += [
+        "-c:a", "aac", "-b:a", p["audio_bitrate"], "-ar", str(p["audio_rate"]), "-ac", "2",
+        "-movflags", "+faststart",
+    ]
+    return args
+
+
+def scale_filter(name, canvas_size):
+    """-vf scale expression when the profile resolution differs from its canvas"""
+    size = PROFILES[name]["size"]
+    if tuple(size) == tuple(canvas_size):
+        return None
+    return f"scale={size[0]}:{size[1]}:flags=lanczos"
+
+
+def estimated_size(name, duration_sec):
+    """Upper-bound file size in bytes, used for the disk check before encoding"""
+    video_kbps = PROFILES[name]["maxrate"] if name in PROFILES else 8000
+    return int((video_kbps + 384) * 1000 / 8 * duration_sec * 1.1)
+
+
+def size_report(outputs, duration_sec):
+    """Print size and average bitrate of each output against its profile cap"""
+    print(f"{'output':<40} {'profile':<16} {'size MB':>8} {'kbit/s':>8} {'cap':>6}")
+    for name, path in outputs.items():
+        if not os.path.exists(path):
+            print(f"{path:<40} {name:<16} {'missing':>8}")
+            continue
+        size = os.path.getsize(path)
+        kbps = size * 8 / 1000 / duration_sec if duration_sec else 0
+        cap = PROFILES[name]["maxrate"] if name in PROFILES else "-"
+        print(f"{path:<40} {name:<16} {size / 1e6:>8.2f} {kbps:>8.0f} {cap:>6}")
@@ -0,0 +1,234 @@
+"""Live progress, ETA and metrics for long renders.
+
+A Progress object is handed to render_timeline(), which reports frames
+queued per scene, while every FFmpeg encoder reports its own position
+through `-progress pipe:1`. Every UPDATE_SEC the tracker prints one status
+line and rewrites two files in STATUS_DIR:
+
+    <job>.json   full snapshot for dashboards and scripts
+    <job>.prom   Prometheus textfile-collector metrics (node_exporter
+                 --collector.textfile.directory=status)
+
+`stalled` turns to 1 when neither the renderer nor any encoder has moved
+for STALL_SEC, which is the thing to alert on.
+"""
+import os
+import json
+import time
+import threading
+
+# --- CONFIGURATION ---
+STATUS_DIR = "status"
+UPDATE_SEC = 5
+STALL_SEC = 120
+METRIC_PREFIX = "chess_render"
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+def _fmt_sec(seconds):
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m" if seconds >= 3600 \
+        else f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+def parse_progress_block(lines):
+    """One `-progress` block (key=value lines up to progress=...) as a dict"""
+    info = {}
+    for line in lines:
+        key, sep, value = line.strip().partition("=")
+        if sep:
+            info[key] = value
+    return info
+
+
+class Progress:
+    """Thread-safe progress tracker for one render job"""
+
+    def __init__(self, job, status_dir=STATUS_DIR, interval=UPDATE_SEC):
+        self.job = job
+        self.status_dir = status_dir
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_advance = self.started
+        self.last_write = 0
+        self.stage = "starting"
+        self.total_frames = 0
+        self.frames = 0
+        self.duration_sec = 0.0
+        self.render_started = None
+        self.render_finished = None
+        self.puzzle = 0
+        self.total_puzzles = 0
+        self.encoders = {}
+        self.state = "running"
+        self.error = None
+        # Keeps the files fresh (and `stalled` honest) when nothing reports
+        threading.Thread(target=self._heartbeat, daemon=True).start()
+
+    def _heartbeat(self):
+        while self.state == "running":
+            time.sleep(self.interval)
+            self.write(force=True)
+
+    # --- reporting from the pipeline ---
+    def set_stage(self, stage):
+        with self.lock:
+            self.stage = stage
+            self.last_advance = time.time()
+        print(f"[{self.job}] {stage}")
+        self.write(force=True)
+
+    def start_render(self, total_frames, outputs, fps):
+        with self.lock:
+            self.stage = "render"
+            self.total_frames = total_frames
+            self.duration_sec = total_frames / fps
+            self.frames = 0
+            self.render_started = time.time()
+            self.render_finished = None
+            self.last_advance = self.render_started
+            self.encoders = {name: {"out_time_sec": 0.0, "speed": 0.0, "fps": 0.0}
+                             for name in outputs}
+        self.write(force=True)
+
+    def frames_done(self, frame_count, scene=None):
+        """Called by the renderer after each scene is queued"""
+        with self.lock:
+            self.frames = frame_count
+            self.last_advance = time.time()
+            if frame_count >= self.total_frames:
+                self.render_finished = self.last_advance
+            overlay = (scene or {}).get("overlay") or {}
+            if overlay.get("puzzle_num"):
+                self.puzzle = overlay["puzzle_num"]
+                self.total_puzzles = overlay.get("total_puzzles") or self.total_puzzles
+        self.write()
+
+    def encoder_update(self, name, info):
+        """Called from an encoder's progress reader with one -progress block"""
+        try:
+            out_time = int(info.get("out_time_us") or info.get("out_time_ms") or 0) / 1e6
+        except ValueError:
+            out_time = 0.0
+        speed = info.get("speed", "").rstrip("x")
+        with self.lock:
+            enc = self.encoders.setdefault(name, {})
+            if out_time > enc.get("out_time_sec", 0):
+                self.last_advance = time.time()
+            enc["out_time_sec"] = out_time
+            enc["speed"] = float(speed) if speed.replace(".", "", 1).isdigit() else 0.0
+            try:
+                enc["fps"] = float(info.get("fps") or 0)
+            except ValueError:
+                enc["fps"] = 0.0
+            if info.get("progress") == "end":
+                enc["done"] = True
+        self.write()
+
+    def finish(self, ok=True, error=None):
+        with self.lock:
+            self.state = "done" if ok else "failed"
+            self.error = str(error) if error else None
+            self.stage = self.state
+        self.write(force=True)
+
+    # --- snapshots ---
+    def snapshot(self):
+        with self.lock:
+            now = time.time()
+            render_end = self.render_finished or now
+            render_elapsed = render_end - self.render_started if self.render_started else 0
+            render_fps = self.frames / render_elapsed if render_elapsed > 0 else 0.0
+
+            etas = []
+            if self.total_frames and render_fps:
+                etas.append((self.total_frames - self.frames) / render_fps)
+            for enc in self.encoders.values():
+                if not enc.get("done") and enc.get("speed"):
+                    etas.append((self.duration_sec - enc["out_time_sec"]) / enc["speed"])
+            eta = max(etas) if etas else None
+
+            encoded = [enc["out_time_sec"] for enc in self.encoders.values()]
+            return {
+                "job": self.job,
+                "state": self.state,
+                "stage": self.stage,
+                "error": self.error,
+                "started": self.started,
+                "updated": now,
+                "elapsed_sec": round(now - self.started, 1),
+                "frames": self.frames,
+                "total_frames": self.total_frames,
+                "render_fps": round(render_fps, 1),
+                "puzzle": self.puzzle,
+                "total_puzzles": self.total_puzzles,
+                "duration_sec": round(self.duration_sec, 1),
+                "encoded_sec": round(min(encoded), 1) if encoded else 0.0,
+                "encoders": {k: dict(v) for k, v in self.encoders.items()},
+                "eta_sec": round(eta, 1) if eta is not None else None,
+                "stalled": self.state == "running" and now - self.last_advance > STALL_SEC,
+            }
+
+    def prometheus(self, snap):
+        labels = f'job="{self.job}"'
+        gauges = [
+            ("frames", "Frames queued to the encoders", snap["frames"]),
+            ("total_frames", "Frames in the timeline", snap["total_frames"]),
+            ("render_fps", "Average frames queued per second", snap["render_fps"]),
+            ("puzzle", "Puzzle currently rendering", snap["puzzle"]),
+            ("total_puzzles", "Puzzles in the video", snap["total_puzzles"]),
+            ("eta_seconds", "Estimated seconds to completion", snap["eta_sec"] or 0),
+            ("stalled", "1 when nothing has progressed for STALL_SEC", int(snap["stalled"])),
+            ("failed", "1 when the job ended with an error", int(snap["state"] == "failed")),
+            ("last_update_timestamp_seconds", "Unix time of this snapshot", round(snap["updated"])),
+        ]
+        out = []
+        for name, help_text, value in gauges:
+            metric = f"{METRIC_PREFIX}_{name}"
+            out += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge",
+                    f"{metric}{{{labels}}} {value}"]
+        for key, name, help_text in (
+                ("out_time_sec", "out_time_seconds", "Seconds of output encoded"),
+                ("speed", "speed", "Encoder speed relative to real time")):
+            metric = f"{METRIC_PREFIX}_encode_{name}"
+            out += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            for output, enc in snap["encoders"].items():
+                out.append(f'{metric}{{{labels},output="{output}"}} {enc.get(key, 0)}')
+        return "\n".join(out) + "\n"
+
+    def write(self, force=False):
+        """Print a status line and rewrite the status files, at most every interval"""
+        now = time.time()
+        with self.lock:
+            if not force and now - self.last_write < self.interval:
+                return
+            self.last_write = now
+        snap = self.snapshot()
+        try:
+            os.makedirs(self.status_dir, exist_ok=True)
+            base = os.path.join(self.status_dir, self.job)
+            _atomic_write(f"{base}.json", json.dumps(snap, indent=2))
+            _atomic_write(f"{base}.prom", self.prometheus(snap))
+        except OSError as e:
+            print(f"[{self.job}] could not write status: {e}")
+
+        if snap["stage"] == "render" and snap["total_frames"]:
+            pct = 100 * snap["frames"] / snap["total_frames"]
+            line = (f"[{self.job}] {pct:5.1f}% {snap['frames']}/{snap['total_frames']} frames, "
+                    f"{snap['render_fps']:.0f} fps")
+            if snap["total_puzzles"]:
+                line += f", puzzle {snap['puzzle']}/{snap['total_puzzles']}"
+            line += f", encoded {_fmt_sec(snap['encoded_sec'])}/{_fmt_sec(snap['duration_sec'])}"
+            line += f", ETA {_fmt_sec(snap['eta_sec'])}"
+            if snap["stalled"]:
+                line += "  STALLED"
+            print(line)
@@ -0,0 +1,96 @@
+"""Progressive HLS output, so long renders can be watched while they build.
+
+An output path ending in .m3u8 makes render_timeline() encode that profile
+as an HLS event playlist with fragmented-MP4 segments instead of a single
+MP4 whose moov atom only exists once FFmpeg exits. Segments land next to
+the playlist every SEGMENT_SEC (plus a forced keyframe at each puzzle
+start, so a puzzle never begins mid-segment) and the playlist grows as
+they do; players and QA can open it from the first segment on. When the
+encode finishes FFmpeg closes the playlist with #EXT-X-ENDLIST, and
+remux() turns it into the usual faststart MP4 by stream copy. The
+playlists and segments are then deleted with remove_live(), whether the
+run succeeded or not, so LIVE_DIR only holds renders still in progress.
+
+    python main_marathon.py --progressive
+    ffplay output_video/live/marathon_<stamp>/facebook_feed/index.m3u8
+"""
+import os
+import shutil
+import subprocess
+
+# --- CONFIGURATION ---
+LIVE_DIR = "output_video/live"
+PLAYLIST_NAME = "index.m3u8"
+SEGMENT_SEC = 4            # a multiple of every profile's gop_sec
+INIT_NAME = "init.mp4"
+SEGMENT_PATTERN = "seg_%05d.m4s"
+
+
+def puzzle_starts(scenes, fps):
+    """Seconds at which each puzzle or break card starts (first one excluded)"""
+    starts, frame, last = [], 0, None
+    for scene in scenes:
+        key = "card" if "card" in scene else (scene.get("overlay") or {}).get("puzzle_num")
+        if frame and key != last:
+            starts.append(frame / fps)
+        last = key
+        frame += scene["frames"]
+    return starts
+
+
+def _without_faststart(output_args):
+    """faststart rewrites the file at the end, which segments don't need"""
+    args = list(output_args)
+    if "-movflags" in args:
+        idx = args.index("-movflags")
+        del args[idx:idx + 2]
+    return args
+
+
+def hls_args(output_args, playlist, keyframe_times=()):
+    """output_args rewritten to write a growing fMP4 HLS playlist at `playlist`"""
+    seg_dir = os.path.dirname(playlist) or "."
+    args = _without_faststart(output_args) + [
+        "-f", "hls", "-hls_time", str(SEGMENT_SEC), "-hls_list_size", "0",
+        "-hls_playlist_type", "event", "-hls_segment_type", "fmp4",
+        "-hls_fmp4_init_filename", INIT_NAME,
+        "-hls_segment_filename", os.path.join(seg_dir, SEGMENT_PATTERN),
+        # temp_file: segments appear under their final name only when complete
+        "-hls_flags", "independent_segments+temp_file",
+    ]
+    if keyframe_times:
+        args += ["-force_key_frames", ",".join(f"{t:.3f}" for t in keyframe_times)]
+    return args
+
+
+def playlist_status(playlist):
+    """(segments, seconds, finished) of a playlist as it stands right now"""
+    segments, seconds, finished = 0, 0.0, False
+    try:
+        with open(playlist, encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("#EXTINF:"):
+                    segments += 1
+                    seconds += float(line[8:].split(",")[0])
+                elif line.startswith("#EXT-X-ENDLIST"):
+                    finished = True
+    except (OSError, ValueError):
+        pass
+    return segments, seconds, finished
+
+
+def remux(playlist, output, ffmpeg_bin):
+    """Finished playlist -> faststart MP4, stream copy only"""
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    subprocess.run([ffmpeg_bin, "-y", "-hide_banner", "-loglevel", "warning",
+                    "-i", playlist, "-c", "copy", "-movflags", "+faststart", output], check=True)
+    return output
+
+
+def remove_live(live_dir):
+    """Delete a run's playlists and segments once its MP4s are out (or it failed)"""
+    shutil.rmtree(live_dir, ignore_errors=True)
+    try:
+        os.rmdir(LIVE_DIR)   # only succeeds once no other run is live
+    except OSError:
+        pass
@@ -0,0 +1,125 @@
+"""Content-addressed publishing into the served output directory.
+
+Published media are named after what they contain:
+
+    output_video/chess_short.mp4 + tag 00sHx
+        -> output_video/chess_short_00sHx_<sha256[:16]>.mp4
+
+so a file is never rewritten once its URL has been handed to Facebook or
+X, concurrent runs cannot overwrite each other, and the web server can send
+`Cache-Control: public, max-age=31536000, immutable` for every *_<hash>.*
+file. The move into place goes through Workspace.publish() (a private
+.part file renamed over the target); publishing content that is already
+there just refreshes its mtime.
+
+prune() enforces the retention policy: hashed files older than
+RETAIN_DAYS go, except the newest RETAIN_MIN and anything a pending post
+in the outbox still points at.
+
+    python publish.py prune --days 14 --dry-run
+"""
+import os
+import re
+import time
+import hashlib
+import argparse
+
+# --- CONFIGURATION ---
+OUTPUT_DIR = "output_video"
+PUBLIC_BASE = "https://roynek.com/Chess_Sol_Puzzles/auto_post/"
+HASH_LEN = 16
+RETAIN_DAYS = 14
+RETAIN_MIN = 20            # newest hashed files always kept, whatever their age
+HASHED_NAME = re.compile(r"_[0-9a-f]{%d}\.[A-Za-z0-9]+$" % HASH_LEN)
+
+
+# --- NAMING ---
+def content_hash(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()[:HASH_LEN]
+
+
+def hashed_name(path, digest, tag=None):
+    """output_video/x.mp4 -> output_video/x[_tag]_<digest>.mp4"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{tag}_{digest}{ext}" if tag else f"{stem}_{digest}{ext}"
+
+
+def publish_output(ws, src, path, tag=None):
+    """Move a finished workspace file to its content-addressed name; returns that name"""
+    dst = hashed_name(path, content_hash(src), tag)
+    if os.path.exists(dst) and os.path.getsize(dst) == os.path.getsize(src):
+        os.utime(dst)      # identical bytes are already published
+        os.remove(src)
+        return dst
+    return ws.publish(src, dst)
+
+
+def public_url(path):
+    return PUBLIC_BASE + path.replace(os.sep, "/")
+
+
+# --- RETENTION ---
+def referenced_media():
+    """Local paths that pending or retrying outbox posts will still fetch"""
+    from outbox import PENDING, RETRY, load_outbox
+
+    paths = set()
+    for record in load_outbox().values():
+        media = (record.get("payload") or {}).get("media") or ""
+        if record.get("status") in (PENDING, RETRY) and media.startswith(PUBLIC_BASE):
+            paths.add(os.path.normpath(media[len(PUBLIC_BASE):]))
+    return paths
+
+
+def prune(out_dir=OUTPUT_DIR, retain_days=RETAIN_DAYS, keep=RETAIN_MIN, dry_run=False):
+    """Remove expired content-addressed files; returns the paths removed"""
+    files = []
+    for root, _, names in os.walk(out_dir):
+        for name in names:
+            if HASHED_NAME.search(name):
+                path = os.path.join(root, name)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+    files.sort(reverse=True)
+    cutoff = time.time() - retain_days * 86400
+    protected = referenced_media()
+
+    removed = []
+    for mtime, path in files[keep:]:
+        if mtime >= cutoff or os.path.normpath(path) in protected:
+            continue
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Could not remove {path}: {e}")
+                continue
+        removed.append(path)
+    verb = "Would remove" if dry_run else "Removed"
+    print(f"{verb} {len(removed)} of {len(files)} published files older than {retain_days} days")
+    return removed
+
+
+# --- MAIN SCRIPT ---
+def main():
+    parser = argparse.ArgumentParser(description="Retention for published media")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("prune", help="delete expired content-addressed outputs")
+    p.add_argument("--days", type=float, default=RETAIN_DAYS)
+    p.add_argument("--keep", type=int, default=RETAIN_MIN)
+    p.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "prune":
+        for path in prune(retain_days=args.days, keep=args.keep, dry_run=args.dry_run):
+            print("  ", path)
+
+
+if __name__ == "__main__":
+    main()
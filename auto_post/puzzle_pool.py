@@ -0,0 +1,310 @@
+"""Columnar in-memory pool of Lichess puzzles for fast local selection.
+
+The whole Lichess export (~4M rows) is held as NumPy columns instead of a
+list of dicts:
+
+    ids          fixed-width bytes; id_order sorts them so by_id() is a binary search
+    rating       int16         popularity   int8      plays  int32
+    n_moves      uint8         theme_bits   uint64 x words (one bit per theme)
+    text         one bytes blob of "FEN|moves" per puzzle; rows keep a span into it
+
+Rows are ordered by rating, so a rating range is a searchsorted slice and
+theme filters only touch that slice. Build once from the CSV and save:
+
+    python puzzle_pool.py build puzzles_db/*.csv --exclude reports/validation_failures.jsonl
+    python puzzle_pool.py sample --theme mateIn2 --min 1500 --max 1800
+"""
+import os
+import csv
+import sys
+import glob
+import random
+import argparse
+
+# --- CONFIGURATION ---
+POOL_FILE = "puzzle_pool.npz"
+ID_WIDTH = 8            # Lichess puzzle IDs are 5 characters
+RANDOM_PROBES = 64      # random draws tried before falling back to a full scan
+
+_pool = None
+
+
+# --- UTILITY FUNCTIONS ---
+def theme_name(words):
+    """'mate in 2' -> 'mateIn2', the spelling used in the Themes column"""
+    parts = words.split()
+    return parts[0] + "".join(p[:1].upper() + p[1:] for p in parts[1:]) if parts else ""
+
+
+def _read_rows(paths, exclude_ids=()):
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh):
+                if row.get("PuzzleId") and row.get("FEN") and row.get("Moves") \
+                        and row["PuzzleId"].strip() not in exclude_ids:
+                    yield row
+
+
+class PuzzlePool:
+    """Immutable column store; build with from_csv() or load()"""
+
+    def __init__(self, columns, theme_names):
+        import numpy as np
+
+        self.ids = columns["ids"]
+        self.rating = columns["rating"]
+        self.popularity = columns["popularity"]
+        self.plays = columns["plays"]
+        self.n_moves = columns["n_moves"]
+        self.theme_bits = columns["theme_bits"]
+        self.text = columns["text"]
+        self.text_start = columns["text_start"]
+        self.text_len = columns["text_len"]
+        self.id_order = columns["id_order"]
+        self.theme_names = list(theme_names)
+        self.theme_index = {name: i for i, name in enumerate(self.theme_names)}
+        self._np = np
+
+    def __len__(self):
+        return len(self.rating)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.ids, self.rating, self.popularity, self.plays,
+                                      self.n_moves, self.theme_bits, self.text,
+                                      self.text_start, self.text_len, self.id_order))
+
+    # --- building and persistence ---
+    @classmethod
+    def from_csv(cls, paths, exclude_ids=()):
+        """Build from Lichess CSV files (PuzzleId, FEN, Moves, Rating, ...)"""
+        import numpy as np
+        from array import array
+
+        theme_index = {}
+        ids, text = bytearray(), bytearray()
+        offsets = array("Q", [0])
+        rating, popularity, plays, n_moves = array("h"), array("b"), array("i"), array("B")
+        theme_rows = []
+        for row in _read_rows(paths, exclude_ids):
+            ids += row["PuzzleId"].strip().encode("ascii")[:ID_WIDTH].ljust(ID_WIDTH, b"\0")
+            moves = row["Moves"].strip()
+            text += f"{row['FEN'].strip()}|{moves}".encode("ascii")
+            offsets.append(len(text))
+            rating.append(int(row.get("Rating") or 0))
+            popularity.append(max(-128, min(127, int(row.get("Popularity") or 0))))
+            plays.append(int(row.get("NbPlays") or 0))
+            n_moves.append(min(255, len(moves.split())))
+            mask = 0
+            for theme in (row.get("Themes") or "").split():
+                mask |= 1 << theme_index.setdefault(theme, len(theme_index))
+            theme_rows.append(mask)
+
+        words = max(1, (len(theme_index) + 63) // 64)
+        theme_bits = np.zeros((len(theme_rows), words), dtype=np.uint64)
+        for w in range(words):
+            theme_bits[:, w] = [(m >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for m in theme_rows]
+        del theme_rows
+
+        columns = {
+            "ids": np.frombuffer(bytes(ids), dtype=f"S{ID_WIDTH}"),
+            "rating": np.asarray(rating, dtype=np.int16),
+            "popularity": np.asarray(popularity, dtype=np.int8),
+            "plays": np.asarray(plays, dtype=np.int32),
+            "n_moves": np.asarray(n_moves, dtype=np.uint8),
+            "theme_bits": theme_bits,
+            "text": np.frombuffer(bytes(text), dtype=np.uint8),
+            "offsets": np.asarray(offsets, dtype=np.uint64),
+        }
+        return cls._sorted(columns, sorted(theme_index, key=theme_index.get))
+
+    @classmethod
+    def _sorted(cls, columns, theme_names):
+        """Reorder rows by rating; the text blob stays put and rows keep spans into it"""
+        import numpy as np
+
+        order = np.argsort(columns["rating"], kind="stable")
+        offsets = columns.pop("offsets")
+        out = {k: v[order] for k, v in columns.items() if k != "text"}
+        out["text"] = columns["text"]
+        out["text_start"] = offsets[:-1][order]
+        out["text_len"] = (offsets[1:] - offsets[:-1])[order].astype(np.uint16)
+        out["id_order"] = np.argsort(out["ids"]).astype(np.int32)
+        return cls(out, theme_names)
+
+    def save(self, path=POOL_FILE):
+        import numpy as np
+
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, ids=self.ids, rating=self.rating, popularity=self.popularity,
+                 plays=self.plays, n_moves=self.n_moves, theme_bits=self.theme_bits,
+                 text=self.text, text_start=self.text_start, text_len=self.text_len,
+                 id_order=self.id_order,
+                 theme_names=np.array(self.theme_names))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=POOL_FILE):
+        import numpy as np
+
+        with np.load(path) as data:
+            columns = {k: data[k] for k in data.files if k != "theme_names"}
+            theme_names = [str(t) for t in data["theme_names"]]
+        return cls(columns, theme_names)
+
+    # --- queries ---
+    def theme_mask(self, themes):
+        """Bit words for a list of theme names; None if any theme is unknown"""
+        mask = self._np.zeros(self.theme_bits.shape[1], dtype=self._np.uint64)
+        for theme in themes:
+            if theme not in self.theme_index:
+                return None
+            bit = self.theme_index[theme]
+            mask[bit // 64] |= self._np.uint64(1 << (bit % 64))
+        return mask
+
+    def themes_for_config(self, theme_config):
+        """Map an /api/puzzles style {"q"|"theme": ...} config to theme names (all must match)"""
+        if theme_config.get("theme"):
+            return [theme_config["theme"]]
+        q = theme_config.get("q") or ""
+        if not q:
+            return []
+        joined = theme_name(q)
+        if joined in self.theme_index:
+            return [joined]
+        return [w for w in q.split() if w in self.theme_index] or [joined]
+
+    def rating_slice(self, min_rating=0, max_rating=9999):
+        lo = int(self._np.searchsorted(self.rating, min_rating, side="left"))
+        hi = int(self._np.searchsorted(self.rating, max_rating, side="right"))
+        return lo, hi
+
+    def filter(self, min_rating=0, max_rating=9999, themes=(), min_popularity=None):
+        """Row indices matching a rating range, all of `themes` and a popularity floor"""
+        np = self._np
+        lo, hi = self.rating_slice(min_rating, max_rating)
+        keep = np.ones(hi - lo, dtype=bool)
+        if themes:
+            mask = self.theme_mask(themes)
+            if mask is None:
+                return np.empty(0, dtype=np.int64)
+            keep &= ((self.theme_bits[lo:hi] & mask) == mask).all(axis=1)
+        if min_popularity is not None:
+            keep &= self.popularity[lo:hi] >= min_popularity
+        return np.flatnonzero(keep) + lo
+
+    def _matches(self, idx, mask, min_popularity):
+        if mask is not None and not ((self.theme_bits[idx] & mask) == mask).all():
+            return False
+        return min_popularity is None or self.popularity[idx] >= min_popularity
+
+    def random_one(self, min_rating=0, max_rating=9999, themes=(), min_popularity=None,
+                   rng=random):
+        """One random matching row index, or None.
+
+        Probes random rows of the rating slice first, which is enough for any
+        common theme; rare combinations fall back to filter().
+        """
+        lo, hi = self.rating_slice(min_rating, max_rating)
+        if hi <= lo:
+            return None
+        mask = self.theme_mask(themes) if themes else None
+        if themes and mask is None:
+            return None
+        for _ in range(RANDOM_PROBES):
+            idx = rng.randrange(lo, hi)
+            if self._matches(idx, mask, min_popularity):
+                return idx
+        matches = self.filter(min_rating, max_rating, themes, min_popularity)
+        return int(matches[rng.randrange(len(matches))]) if len(matches) else None
+
+    def sample(self, n, min_rating=0, max_rating=9999, themes=(), min_popularity=None,
+               rng=random):
+        """Up to n distinct matching row indices"""
+        matches = self.filter(min_rating, max_rating, themes, min_popularity)
+        if len(matches) <= n:
+            return [int(i) for i in matches]
+        return [int(matches[i]) for i in rng.sample(range(len(matches)), n)]
+
+    def by_id(self, puzzle_id):
+        key = puzzle_id.encode("ascii")[:ID_WIDTH]
+        pos = int(self._np.searchsorted(self.ids, key, sorter=self.id_order))
+        if pos < len(self.id_order) and self.ids[self.id_order[pos]] == key:
+            return int(self.id_order[pos])
+        return None
+
+    def puzzle(self, idx):
+        """Row as a dict shaped like the /api/puzzles results"""
+        start = int(self.text_start[idx])
+        raw = self.text[start:start + int(self.text_len[idx])].tobytes()
+        fen, moves = raw.decode("ascii").split("|", 1)
+        words = self.theme_bits[idx]
+        themes = [name for bit, name in enumerate(self.theme_names)
+                  if int(words[bit // 64]) >> (bit % 64) & 1]
+        return {
+            "id": self.ids[idx].decode("ascii"),
+            "fen": fen,
+            "moves": moves,
+            "rating": int(self.rating[idx]),
+            "popularity": int(self.popularity[idx]),
+            "plays": int(self.plays[idx]),
+            "themes": " ".join(themes),
+        }
+
+
+def load_pool(path=POOL_FILE):
+    """The saved pool, loaded once per process; None when there is no pool file"""
+    global _pool
+    if _pool is None and os.path.exists(path):
+        _pool = PuzzlePool.load(path)
+        print(f"Loaded puzzle pool: {len(_pool)} puzzles, {_pool.nbytes / 1e6:.0f} MB")
+    return _pool
+
+
+# --- MAIN SCRIPT ---
+def main():
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or query the local puzzle pool")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the pool from Lichess CSV files")
+    build.add_argument("csv", nargs="+")
+    build.add_argument("--out", default=POOL_FILE)
+    build.add_argument("--exclude", help="validation failure report whose puzzles are skipped")
+    query = sub.add_parser("sample", help="draw random puzzles from the pool")
+    query.add_argument("--theme", action="append", default=[])
+    query.add_argument("--min", type=int, default=0)
+    query.add_argument("--max", type=int, default=9999)
+    query.add_argument("-n", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        paths = [p for pattern in args.csv for p in sorted(glob.glob(pattern))]
+        if not paths:
+            sys.exit("No CSV files matched")
+        exclude = set()
+        if args.exclude:
+            from validate_puzzles import failed_ids
+            exclude = failed_ids(args.exclude)
+            print(f"Excluding {len(exclude)} puzzles that failed validation")
+        start = time.perf_counter()
+        pool = PuzzlePool.from_csv(paths, exclude)
+        pool.save(args.out)
+        print(f"{len(pool)} puzzles, {len(pool.theme_names)} themes, "
+              f"{pool.nbytes / 1e6:.0f} MB in {time.perf_counter() - start:.1f}s -> {args.out}")
+        return
+
+    pool = load_pool()
+    if pool is None:
+        sys.exit(f"No pool at {POOL_FILE}; run `python puzzle_pool.py build <csv>` first")
+    start = time.perf_counter()
+    picks = pool.sample(args.n, args.min, args.max, args.theme) if args.n > 1 else \
+        [i for i in [pool.random_one(args.min, args.max, args.theme)] if i is not None]
+    print(f"{len(picks)} picks in {(time.perf_counter() - start) * 1e6:.0f} µs")
+    for idx in picks:
+        print(pool.puzzle(idx))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Puzzle fetching for the render scripts.
+
+fetch_puzzle() gets one puzzle by ID or at random. fetch_puzzles() asks
+the /api/puzzles endpoint for only as many puzzles per theme as the video
+needs, from random pages among each theme's most popular matches,
+de-duplicates by puzzle ID and draws a sample stratified by theme and
+rating band. When a local puzzle_pool.npz exists, candidates are drawn
+from it instead of the API. Listing pages and puzzles fetched by ID go
+through http_cache, so repeat runs reuse (and revalidate) earlier
+responses and keep working from the cache while the API is down. Every
+puzzle handed out has been replayed by validate_puzzles.validate_puzzle()
+and carries its render features.
+"""
+import math
+import random
+
+import http_cache
+from puzzle_pool import load_pool
+from validate_puzzles import validate_puzzle
+
+# --- CONFIGURATION ---
+API_BASE = "https://roynek.com/Chess_Sol_Puzzles/api"
+PAGE_LIMIT = 50        # the server caps `limit` at 50
+OVERSAMPLE = 2         # candidates fetched per puzzle we want from a theme
+MAX_PAGES = 4          # per theme, so an exhausted query can't loop forever
+VARIETY_WINDOW = 500   # most popular matches per theme that pages are drawn from
+RATING_BANDS = [(0, 1399), (1400, 1799), (1800, 2199), (2200, 9999)]
+PAGE_TTL = 24 * 3600           # /api/puzzles result sets barely change
+PUZZLE_TTL = 30 * 24 * 3600    # a puzzle fetched by ID never does
+
+_session = None
+
+
+def get_session():
+    """Shared keep-alive session for all API calls"""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
+
+
+def theme_label(theme_config):
+    return theme_config.get("q") or theme_config.get("theme") or "any"
+
+
+def rating_band(rating, bands=RATING_BANDS):
+    for idx, (low, high) in enumerate(bands):
+        if low <= rating <= high:
+            return idx
+    return len(bands) - 1
+
+
+def annotate(puzzle):
+    """Add render features to a puzzle; False (and a log line) if it is broken"""
+    features, error = validate_puzzle(puzzle)
+    if error:
+        print(f"Skipping puzzle {puzzle.get('id')}: {error}")
+        return False
+    puzzle.update(features)
+    return True
+
+
+def _page_params(theme_config, limit, page):
+    return dict(theme_config, limit=limit, page=page)
+
+
+def fetch_page(theme_config, limit, page=1):
+    """One page of /api/puzzles for a theme config; returns the JSON body"""
+    params = _page_params(theme_config, limit, page)
+    return http_cache.get_json(get_session(), f"{API_BASE}/puzzles", params, ttl=PAGE_TTL)
+
+
+def cached_pages(theme_config, limit, pages):
+    """The pages among `pages` that http_cache can still serve for this theme"""
+    return [p for p in pages
+            if http_cache.has_entry(f"{API_BASE}/puzzles", _page_params(theme_config, limit, p))]
+
+
+def fetch_puzzle(puzzle_id=None, min_rating=1000, max_rating=None):
+    """A single puzzle by ID, or a random one in the rating range"""
+    if puzzle_id:
+        puzzle = http_cache.get_json(get_session(), f"{API_BASE}/puzzle/{puzzle_id}",
+                                     ttl=PUZZLE_TTL)
+    else:
+        # Random picks must not be cached
+        params = {"min": min_rating}
+        if max_rating:
+            params["max"] = max_rating
+        response = get_session().get(f"{API_BASE}/puzzle/random-by-rating", params=params,
+                                     timeout=30)
+        response.raise_for_status()
+        puzzle = response.json()
+    features, error = validate_puzzle(puzzle)
+    if error:
+        raise ValueError(f"Puzzle {puzzle.get('id')} is broken: {error}")
+    puzzle.update(features)
+    return puzzle
+
+
+def fetch_theme_candidates(theme_config, wanted, seen_ids, rng=random):
+    """Fetch until `wanted` puzzles not already in seen_ids are collected.
+
+    /api/puzzles always sorts by popularity, so pages are drawn at random
+    from the theme's VARIETY_WINDOW most popular matches rather than always
+    starting at page 1; the small pages keep the payload down without every
+    run seeing the same few puzzles. Random pages are rarely in the cache,
+    so when the API fails the remaining draw is narrowed to cached pages.
+    """
+    import requests
+
+    collected = []
+    limit = min(PAGE_LIMIT, wanted)
+    pages = list(range(1, max(1, VARIETY_WINDOW // limit) + 1))
+    rng.shuffle(pages)
+    fetched = 0
+    while pages and len(collected) < wanted and fetched < MAX_PAGES:
+        page = pages.pop()
+        try:
+            data = fetch_page(theme_config, limit, page)
+        except requests.RequestException as e:
+            offline = cached_pages(theme_config, limit, pages)
+            if not offline:
+                raise
+            print(f"  API unavailable ({e}); drawing from {len(offline)} cached pages")
+            pages = offline
+            continue
+        total_pages = data.get('totalPages')
+        if total_pages is not None:
+            # Fewer matches than the window: only draw from pages that exist
+            pages = [p for p in pages if p <= total_pages]
+            if page > total_pages:
+                continue
+        fetched += 1
+        for puzzle in data.get('results') or []:
+            if puzzle['id'] in seen_ids:
+                continue
+            seen_ids.add(puzzle['id'])
+            if not annotate(puzzle):
+                continue
+            puzzle['theme_label'] = theme_label(theme_config)
+            collected.append(puzzle)
+    return collected
+
+
+def stratified_sample(candidates_by_theme, num_puzzles, bands=RATING_BANDS, rng=random):
+    """Round-robin over themes, and within a theme over rating bands"""
+    strata = []
+    for candidates in candidates_by_theme:
+        by_band = [[] for _ in bands]
+        for puzzle in candidates:
+            by_band[rating_band(int(puzzle.get('rating') or 0), bands)].append(puzzle)
+        for band in by_band:
+            rng.shuffle(band)
+        strata.append({"bands": by_band, "next_band": rng.randrange(len(bands))})
+
+    selected = []
+    while len(selected) < num_puzzles:
+        progressed = False
+        for stratum in strata:
+            if len(selected) >= num_puzzles:
+                break
+            by_band = stratum["bands"]
+            for step in range(len(by_band)):
+                idx = (stratum["next_band"] + step) % len(by_band)
+                if by_band[idx]:
+                    selected.append(by_band[idx].pop())
+                    stratum["next_band"] = (idx + 1) % len(by_band)
+                    progressed = True
+                    break
+        if not progressed:
+            break
+    rng.shuffle(selected)
+    return selected
+
+
+def pool_theme_candidates(pool, theme_config, wanted, seen_ids):
+    """Like fetch_theme_candidates(), served from the local PuzzlePool"""
+    themes = pool.themes_for_config(theme_config)
+    picks = pool.sample(wanted + len(seen_ids), theme_config.get("min", 0),
+                        theme_config.get("max", 9999), themes)
+    collected = []
+    for idx in picks:
+        puzzle = pool.puzzle(idx)
+        if puzzle['id'] in seen_ids:
+            continue
+        seen_ids.add(puzzle['id'])
+        if not annotate(puzzle):
+            continue
+        puzzle['theme_label'] = theme_label(theme_config)
+        collected.append(puzzle)
+        if len(collected) >= wanted:
+            break
+    return collected
+
+
+def fetch_puzzles(themes, num_puzzles=60):
+    """Fetch a theme- and rating-balanced selection of num_puzzles puzzles"""
+    per_theme = math.ceil(num_puzzles / max(1, len(themes))) * OVERSAMPLE
+    seen_ids = set()
+    candidates_by_theme = []
+    fetched = 0
+    pool = load_pool()
+
+    for theme_config in themes:
+        try:
+            print(f"Fetching {per_theme} from theme {theme_config}")
+            if pool is not None:
+                candidates = pool_theme_candidates(pool, theme_config, per_theme, seen_ids)
+            else:
+                candidates = fetch_theme_candidates(theme_config, per_theme, seen_ids)
+            candidates_by_theme.append(candidates)
+            fetched += len(candidates)
+            print(f"  -> Got {len(candidates)} new puzzles")
+        except Exception as e:
+            print(f"Error fetching theme {theme_config}: {e}")
+            continue
+
+    selected_puzzles = stratified_sample(candidates_by_theme, num_puzzles)
+
+    print(f"\nTotal unique puzzles collected: {fetched}")
+    if pool is None:
+        print(f"API responses: {http_cache.summary()}")
+    print(f"Selected for video: {len(selected_puzzles)}")
+
+    return selected_puzzles
@@ -0,0 +1,218 @@
+"""Long-running render daemon with a file-queue interface.
+
+Keeps chess/cairosvg/PIL imported, fonts and recently used board layers in
+memory, the FFmpeg path probed and the HTTP session open, so a scheduled
+short is a sub-second job submission instead of a cold script start.
+
+    python render_daemon.py serve
+    python render_daemon.py submit --platform facebook_reels --post
+    python render_daemon.py submit --puzzle 00sHx --platform x --platform youtube
+
+Jobs are JSON files dropped into QUEUE_DIR/incoming (written atomically);
+the daemon moves each one to processing/, then done/ or failed/ with the
+result attached.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import argparse
+
+from clip_library import record_clip
+from covers import write_covers
+from profiles import PROFILES, estimated_size
+from progress import Progress
+from publish import publish_output
+from social import post_outputs
+from workspace import Workspace
+
+# --- CONFIGURATION ---
+QUEUE_DIR = "render_queue"
+POLL_SEC = 0.5
+OUTPUT_DIR = "output_video"
+STATES = ("incoming", "processing", "done", "failed")
+
+
+def queue_path(state, name=""):
+    return os.path.join(QUEUE_DIR, state, name)
+
+
+# --- CLIENT SIDE ---
+def submit_job(profiles, puzzle_id=None, min_rating=1000, post=False):
+    """Atomically drop a job file into the queue; returns the job id"""
+    os.makedirs(queue_path("incoming"), exist_ok=True)
+    job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    job = {
+        "id": job_id,
+        "puzzle": puzzle_id,
+        "min_rating": min_rating,
+        "profiles": profiles,
+        "post": post,
+        "submitted_at": time.time(),
+    }
+    tmp = queue_path("incoming", f".{job_id}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(job, fh)
+    os.replace(tmp, queue_path("incoming", f"{job_id}.json"))
+    return job_id
+
+
+# --- DAEMON SIDE ---
+class RenderDaemon:
+    """Holds the warm state and processes queued jobs one at a time"""
+
+    def __init__(self):
+        # Heavy imports happen once, here, instead of once per cron run
+        import chess
+        import renderer
+        import puzzle_source
+        from ffmpeg_probe import ffmpeg_bin
+        self.chess = chess
+        self.renderer = renderer
+        self.puzzle_source = puzzle_source
+        self.ffmpeg_bin = ffmpeg_bin()
+        self.running = True
+        self.warm_up()
+
+    def warm_up(self):
+        """Load fonts, rasterize a first board and open the HTTP session"""
+        start = time.time()
+        for px in (28, 36, 40, 60, 70, 120):
+            self.renderer.get_font(self.renderer._scaled(px))
+        self.renderer.get_board_layer(self.chess.STARTING_FEN)
+        self.puzzle_source.get_session()
+        print(f"Warm-up done in {time.time() - start:.2f}s (FFmpeg: {self.ffmpeg_bin})")
+
+    def recover(self):
+        """Requeue jobs a previous daemon was processing when it died"""
+        for name in os.listdir(queue_path("processing")):
+            os.replace(queue_path("processing", name), queue_path("incoming", name))
+            print(f"Requeued interrupted job {name}")
+
+    def next_job(self):
+        names = sorted(n for n in os.listdir(queue_path("incoming")) if n.endswith(".json"))
+        for name in names:
+            try:
+                os.replace(queue_path("incoming", name), queue_path("processing", name))
+            except FileNotFoundError:
+                continue  # another daemon claimed it
+            try:
+                with open(queue_path("processing", name)) as fh:
+                    job = json.load(fh)
+                if not isinstance(job, dict) or not job.get("profiles"):
+                    raise ValueError("job has no profiles")
+            except (OSError, ValueError) as e:
+                self.reject(name, e)
+                continue
+            job.setdefault("id", name[:-len(".json")])
+            return name, job
+        return None, None
+
+    def reject(self, name, error):
+        """Move an unreadable job file to failed/ so it can't crash-loop the daemon"""
+        try:
+            with open(queue_path("processing", name), errors="replace") as fh:
+                raw = fh.read()
+        except OSError:
+            raw = None
+        with open(queue_path("failed", name), "w") as fh:
+            json.dump({"id": name[:-len(".json")], "error": f"unreadable job: {error}",
+                       "raw": raw, "finished_at": time.time()}, fh, indent=2)
+        try:
+            os.remove(queue_path("processing", name))
+        except OSError:
+            pass
+        print(f"Job {name} rejected: {error}")
+
+    def run_job(self, job, progress=None):
+        data = self.puzzle_source.fetch_puzzle(job.get("puzzle"), job.get("min_rating", 1000))
+        side_to_move = self.renderer.solver_side(data['fen'])
+
+        scenes = self.renderer.build_puzzle_timeline(data['fen'], data['moves'],
+                                                     data['rating'], side_to_move)
+        duration_sec = sum(scene["frames"] for scene in scenes) / self.renderer.FPS
+        estimate = sum(estimated_size(p, duration_sec) for p in job["profiles"])
+        with Workspace("daemon", estimate_bytes=estimate) as ws:
+            scratch = {profile: ws.path(f"{profile}.mp4") for profile in job["profiles"]}
+            frame_count = self.renderer.render_timeline(scenes, scratch, self.ffmpeg_bin,
+                                                        progress=progress)
+            outputs = {
+                profile: publish_output(ws, path,
+                                        os.path.join(OUTPUT_DIR, f"{data['id']}_{profile}.mp4"))
+                for profile, path in scratch.items()
+            }
+        for profile, path in outputs.items():
+            record_clip(data, profile, path, frame_count / self.renderer.FPS)
+        covers = write_covers(scenes, data['id'], job["profiles"])
+
+        if job.get("post"):
+            self.post(data, side_to_move, outputs)
+        return {"puzzle": data['id'], "outputs": outputs, "covers": covers}
+
+    def post(self, data, side_to_move, outputs):
+        post_outputs(data, side_to_move, outputs)
+
+    def serve(self):
+        for state in STATES:
+            os.makedirs(queue_path(state), exist_ok=True)
+        self.recover()
+        print(f"Render daemon watching {queue_path('incoming')}")
+        while self.running:
+            name, job = self.next_job()
+            if job is None:
+                time.sleep(POLL_SEC)
+                continue
+            start = time.time()
+            print(f"Job {job['id']}: {job['profiles']} puzzle={job.get('puzzle') or 'random'}")
+            progress = Progress("render_daemon")
+            try:
+                job["result"] = self.run_job(job, progress)
+                state = "done"
+                progress.finish()
+            except Exception as e:
+                job["error"] = str(e)
+                state = "failed"
+                progress.finish(ok=False, error=e)
+            job["finished_at"] = time.time()
+            job["elapsed_sec"] = round(job["finished_at"] - start, 3)
+            with open(queue_path(state, name), "w") as fh:
+                json.dump(job, fh, indent=2)
+            os.remove(queue_path("processing", name))
+            print(f"Job {job['id']} {state} in {job['elapsed_sec']}s")
+
+    def stop(self, *_):
+        print("Stopping after the current job...")
+        self.running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="run the daemon")
+    submit = sub.add_parser("submit", help="queue a render job")
+    submit.add_argument("--puzzle", help="puzzle ID (default: random)")
+    submit.add_argument("--min-rating", type=int, default=1000)
+    submit.add_argument("--platform", action="append", dest="profiles",
+                        help="output profile, repeatable (default: facebook_feed)")
+    submit.add_argument("--post", action="store_true", help="queue social posts when done")
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        unknown = [p for p in args.profiles or [] if p not in PROFILES]
+        if unknown:
+            parser.error(f"unknown platform profile(s): {', '.join(unknown)}")
+        job_id = submit_job(args.profiles or ["facebook_feed"], args.puzzle,
+                            args.min_rating, args.post)
+        print("Queued job", job_id)
+        return
+
+    daemon = RenderDaemon()
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.serve()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
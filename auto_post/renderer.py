@@ -0,0 +1,557 @@
+"""Shared board renderer: one board layer per position, many canvases.
+
+A video is described as a timeline of scenes (a position plus its overlay
+text, held for N frames). render_timeline() rasterizes each scene's board
+once, composites it into every requested layout (square, 9:16 reels,
+16:9 long-form) and streams the raw frames to one FFmpeg encoder per
+output profile (see profiles.py), all encoding concurrently.
+
+chess, cairosvg and PIL are imported where they are first needed so that
+planning-only callers (dry runs, job submission) stay fast to start.
+"""
+import io
+import os
+import queue
+import threading
+import subprocess
+from collections import OrderedDict
+
+import board_cache
+from profiles import PROFILES, output_args as profile_output_args, scale_filter
+
+# --- CONFIGURATION ---
+FPS = 30
+COUNTDOWN_SEC = 10
+MOVE_SEC = 1
+BREAK_SEC = 3
+FONT_PATH = "./Roboto-Regular.ttf"
+BACKGROUND_COLOR = (40, 40, 40)
+
+# Audio files
+BACKGROUND_MUSIC = "bg_music.mp3"
+CLICK_SOUND = "move.mp3"
+
+# All layouts share one board size so each position is rasterized only once
+BOARD_SIZE = 1080
+
+# Canvas size and where the board layer goes on it. Reels get a header and
+# footer band, landscape gets a side panel either side of the board.
+LAYOUTS = {
+    "square": {"size": (1080, 1080), "board": (0, 0)},
+    "reels": {"size": (1080, 1920), "board": (0, 420)},
+    "landscape": {"size": (1920, 1080), "board": (420, 0)},
+}
+
+# Board layers kept in memory; a long-running process (render_daemon.py)
+# reuses them across jobs. Capped by bytes, since PIL keeps RGB at 4 bytes
+# a pixel: a 1080px layer is ~4.7 MB, so this holds about 30 of them
+LAYER_CACHE_BYTES = 150 * 2**20
+# Rasterized boards are also kept across runs in board_cache/. Bump the
+# style version whenever the board's look changes to invalidate old entries.
+USE_DISK_CACHE = True
+BOARD_STYLE_VERSION = 1
+
+DEFAULT_OUTPUT_ARGS = ["-c:v", "libx264", "-pix_fmt", "yuv420p"]
+
+# "pil" draws the overlay text onto every frame; "ass" renders boards only
+# and has FFmpeg burn the text in from a subtitle track (needs libass)
+OVERLAY_MODE = "pil"
+
+# Processes compositing frames for render_timeline(); 1 renders in-process
+RENDER_WORKERS = 1
+
+
+# --- FONTS ---
+_fonts = {}
+
+def get_font(size):
+    """Load each font size once per process instead of once per frame"""
+    if size not in _fonts:
+        from PIL import ImageFont
+
+        _fonts[size] = ImageFont.truetype(FONT_PATH, size)
+    return _fonts[size]
+
+
+def _scaled(px):
+    # Text sizes were tuned for the original 800px board
+    return int(px * BOARD_SIZE / 800)
+
+
+# --- TIMELINE ---
+def solver_side(fen):
+    """'White'/'Black' for the side solving the puzzle (opponent of the FEN side)"""
+    import chess
+
+    solver_color = not chess.Board(fen).turn
+    return "White" if solver_color == chess.WHITE else "Black"
+
+
+def board_scene(board, frames, last_move=None, **overlay):
+    return {
+        "fen": board.fen(),
+        "last_move": last_move.uci() if last_move else None,
+        "frames": frames,
+        "overlay": overlay,
+    }
+
+
+def card_scene(title, subtitle, frames):
+    return {"card": (title, subtitle), "frames": frames}
+
+
+def build_puzzle_timeline(fen, moves, rating=None, side_to_move=None, intro_sec=1,
+                          outro_sec=2, outro_message=None, **overlay):
+    """Scenes for one puzzle: position, setup move, countdown, solution, pause.
+
+    Extra keyword arguments (puzzle_num, total_puzzles, message) are shown on
+    every scene. Raises ValueError on malformed moves.
+    """
+    import chess
+
+    if isinstance(moves, str):
+        moves = moves.split()
+    board = chess.Board(fen)
+    overlay = dict(overlay, rating=rating, side_to_move=side_to_move)
+    scenes = [board_scene(board, FPS * intro_sec, **overlay)]
+
+    # --- First move (the setup move) ---
+    first_move = chess.Move.from_uci(moves[0])
+    board.push(first_move)
+    scenes.append(board_scene(board, FPS * MOVE_SEC, last_move=first_move, **overlay))
+
+    # --- Countdown AFTER first move ---
+    for sec in range(COUNTDOWN_SEC, 0, -1):
+        scenes.append(board_scene(board, FPS, timer=sec, **overlay))
+
+    # --- Remaining moves (solution) ---
+    for move_uci in moves[1:]:
+        move = chess.Move.from_uci(move_uci)
+        board.push(move)
+        scenes.append(board_scene(board, FPS * MOVE_SEC, last_move=move, **overlay))
+
+    # Final pause
+    if outro_message:
+        overlay = dict(overlay, message=outro_message)
+    scenes.append(board_scene(board, FPS * outro_sec, **overlay))
+    return scenes
+
+
+def puzzle_duration(n_moves, intro_sec=1, outro_sec=2):
+    """Seconds build_puzzle_timeline() produces for a line of n_moves moves"""
+    return intro_sec + COUNTDOWN_SEC + n_moves * MOVE_SEC + outro_sec
+
+
+def break_scene(puzzle_num, total_puzzles):
+    """'Next Puzzle k/N' card shown between marathon puzzles"""
+    return card_scene("Next Puzzle", f"{puzzle_num + 1}/{total_puzzles}", FPS * BREAK_SEC)
+
+
+# --- DRAWING ---
+def render_board_layer(fen, last_move=None, size=None, orientation="white"):
+    """Rasterize one position to an RGB image (no temp files)"""
+    import chess
+    import chess.svg
+    import cairosvg
+    from PIL import Image
+
+    svg_data = chess.svg.board(
+        chess.Board(fen),
+        size=size or BOARD_SIZE,
+        lastmove=chess.Move.from_uci(last_move) if last_move else None,
+        orientation=chess.WHITE if orientation == "white" else chess.BLACK
+    ).encode("UTF-8")
+    png = cairosvg.svg2png(bytestring=svg_data)
+    return Image.open(io.BytesIO(png)).convert("RGB")
+
+
+def layer_nbytes(layer):
+    """Memory PIL holds for a board layer (RGB is stored as 4 bytes a pixel)"""
+    return layer.width * layer.height * 4
+
+
+_layer_cache = OrderedDict()
+_layer_bytes = 0
+# Render threads (pipeline.py) share the LRU; rasterizing happens outside the lock
+_layer_lock = threading.Lock()
+
+def get_board_layer(fen, last_move=None, size=None, orientation="white"):
+    """render_board_layer() behind a process-wide LRU and the on-disk cache"""
+    size = size or BOARD_SIZE
+    key = (fen, last_move, size, orientation)
+    with _layer_lock:
+        if key in _layer_cache:
+            _layer_cache.move_to_end(key)
+            return _layer_cache[key]
+
+    layer = None
+    if USE_DISK_CACHE:
+        import chess
+        disk_key = board_cache.cache_key(fen, last_move, orientation, size,
+                                         f"{BOARD_STYLE_VERSION}/{chess.__version__}")
+        layer = board_cache.load(disk_key)
+    if layer is None:
+        layer = render_board_layer(fen, last_move, size, orientation)
+        if USE_DISK_CACHE:
+            board_cache.store(disk_key, layer)
+
+    global _layer_bytes
+    with _layer_lock:
+        if key not in _layer_cache:
+            _layer_bytes += layer_nbytes(layer)
+        _layer_cache[key] = layer
+        _layer_cache.move_to_end(key)
+        while _layer_bytes > LAYER_CACHE_BYTES and len(_layer_cache) > 1:
+            _, old = _layer_cache.popitem(last=False)
+            _layer_bytes -= layer_nbytes(old)
+    return layer
+
+
+def _wrap(draw, text, font, width):
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if line and draw.textlength(candidate, font=font) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _info_lines(overlay):
+    """(text, font size, colour) for the stacked info block"""
+    lines = []
+    if overlay.get("puzzle_num") and overlay.get("total_puzzles"):
+        lines.append((f"Puzzle {overlay['puzzle_num']}/{overlay['total_puzzles']}", 28, "yellow"))
+    if overlay.get("rating") is not None:
+        lines.append((f"Rating: {overlay['rating']}", 36, "white"))
+    if overlay.get("side_to_move"):
+        lines.append((f"{overlay['side_to_move']} to move", 36, "white"))
+    if overlay.get("message"):
+        lines.append((overlay["message"], 28, "lightblue"))
+    return lines
+
+
+def _info_items(draw, overlay, box):
+    """Info block lines, top-left inside box=(x, y, width)"""
+    x, y, width = box
+    items = []
+    for text, px, colour in _info_lines(overlay):
+        font = get_font(_scaled(px))
+        for line in _wrap(draw, text, font, width):
+            items.append((line, font.size, colour, (x, y), False))
+            y += int(font.size * 1.15)
+    return items
+
+
+def overlay_items(layout_name, scene, draw):
+    """Text for a scene on a layout as (text, font px, colour, (x, y), centered).
+
+    (x, y) is the top-left corner, or the centre when centered is True.
+    compose_frame() draws these with PIL; subtitles.py turns the same items
+    into an ASS track so FFmpeg can burn them in instead.
+    """
+    layout = LAYOUTS[layout_name]
+    cw, ch = layout["size"]
+
+    if "card" in scene:
+        title, subtitle = scene["card"]
+        return [(title, _scaled(70), "white", (cw // 2, ch // 2 - _scaled(60)), True),
+                (subtitle, _scaled(40), "yellow", (cw // 2, ch // 2 + _scaled(40)), True)]
+
+    bx, by = layout["board"]
+    overlay = scene["overlay"]
+    timer = overlay.get("timer")
+    margin = _scaled(20)
+
+    if layout_name == "reels":
+        items = _info_items(draw, overlay, (margin * 2, margin * 2, cw - margin * 4))
+        timer_item = (_scaled(120), (cw // 2, (by + BOARD_SIZE + ch) // 2))
+    elif layout_name == "landscape":
+        items = _info_items(draw, overlay, (margin, margin * 2, bx - margin * 2))
+        timer_item = (_scaled(120), ((bx + BOARD_SIZE + cw) // 2, ch // 2))
+    else:
+        # Square: text sits on top of the board as in the original shorts
+        items = _info_items(draw, overlay, (bx + margin, by + margin, BOARD_SIZE - margin * 2))
+        timer_item = (_scaled(60), (bx + BOARD_SIZE // 2, by + BOARD_SIZE // 2))
+    if timer is not None:
+        px, center = timer_item
+        items.append((str(timer), px, "white", center, True))
+    return items
+
+
+def _draw_centered(draw, text, font, center, fill):
+    bbox = draw.textbbox((0, 0), text, font=font)
+    w = bbox[2] - bbox[0]
+    h = bbox[3] - bbox[1]
+    draw.text((center[0] - w // 2, center[1] - h // 2), text, font=font, fill=fill)
+
+
+def compose_frame(layout_name, scene, board_layer=None, draw_text=True, size=None):
+    """Composite a scene into the named layout's canvas.
+
+    With draw_text=False only the board is drawn; the text comes from an
+    ASS track at encode time (see render_timeline's overlay_mode). size
+    scales the whole layout down (drafts); board_layer must then already
+    be rasterized at the scaled board size.
+    """
+    from PIL import Image, ImageDraw
+
+    layout = LAYOUTS[layout_name]
+    size = size or layout["size"]
+    scale = size[0] / layout["size"][0]
+    im = Image.new("RGB", size, BACKGROUND_COLOR)
+    if "card" not in scene:
+        im.paste(board_layer, tuple(int(round(v * scale)) for v in layout["board"]))
+    if not draw_text:
+        return im
+
+    draw = ImageDraw.Draw(im)
+    for text, px, colour, pos, centered in overlay_items(layout_name, scene, draw):
+        font = get_font(max(1, int(round(px * scale))))
+        pos = tuple(int(round(v * scale)) for v in pos)
+        if centered:
+            _draw_centered(draw, text, font, pos, colour)
+        else:
+            draw.text(pos, text, font=font, fill=colour)
+    return im
+
+
+# --- ENCODING ---
+def encoder_command(ffmpeg_bin, size, output, duration_sec, audio_mix=(0.3, 0.7),
+                    output_args=None, video_filter=None, progress=False, fps=FPS, threads=None):
+    """FFmpeg command reading raw RGB frames from stdin and mixing the audio bed.
+
+    The music is looped and the output cut to the exact timeline length, so
+    long videos no longer stop when the track ends. With progress=True FFmpeg
+    writes `-progress` blocks to stdout for Encoder to parse. threads caps
+    the encoder's threads (default: FFmpeg picks one per core).
+    """
+    w, h = size
+    bg_volume, click_volume = audio_mix
+    cmd = [
+        ffmpeg_bin, "-y", "-hide_banner", "-loglevel", "warning",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}",
+        "-framerate", str(fps), "-i", "pipe:0",
+        "-stream_loop", "-1", "-i", BACKGROUND_MUSIC, "-i", CLICK_SOUND,
+        "-filter_complex",
+        f"[1:a]volume={bg_volume}[a1];[2:a]volume={click_volume}[a2];"
+        f"[a1][a2]amix=inputs=2:duration=first[aout]",
+        "-map", "0:v", "-map", "[aout]",
+    ]
+    if video_filter:
+        cmd += ["-vf", video_filter]
+    if progress:
+        cmd += ["-progress", "pipe:1", "-nostats"]
+    if threads:
+        cmd += ["-threads", str(threads), "-filter_threads", str(threads)]
+    cmd += [*(output_args or DEFAULT_OUTPUT_ARGS), "-t", f"{duration_sec:.3f}", output]
+    return cmd
+
+
+def output_layout(name):
+    """Outputs are keyed by profile name, or by a bare layout name"""
+    return PROFILES[name]["layout"] if name in PROFILES else name
+
+
+class Encoder:
+    """One FFmpeg process fed raw frames through stdin by a writer thread.
+
+    The bounded queue lets the renderer run ahead of a slow encoder by a few
+    scenes without buffering the whole video in memory.
+    """
+
+    def __init__(self, cmd, queue_size=8, on_progress=None):
+        self.cmd = cmd
+        self.error = None
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE if on_progress else None)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._pump, daemon=True)
+        self.thread.start()
+        self.reader = None
+        if on_progress:
+            self.reader = threading.Thread(target=self._read_progress, args=(on_progress,),
+                                           daemon=True)
+            self.reader.start()
+
+    def _read_progress(self, on_progress):
+        """Hand each `-progress` block (ends with progress=continue|end) to the callback"""
+        from progress import parse_progress_block
+
+        block = []
+        for raw in self.proc.stdout:
+            line = raw.decode("utf-8", "replace").strip()
+            block.append(line)
+            if line.startswith("progress="):
+                try:
+                    on_progress(parse_progress_block(block))
+                except Exception as e:
+                    print(f"Progress callback failed: {e}")
+                block = []
+
+    def _pump(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            data, count, done = item
+            if not self.error:   # after an error keep draining so the producer never blocks
+                try:
+                    for _ in range(count):
+                        self.proc.stdin.write(data)
+                except (BrokenPipeError, OSError) as e:
+                    self.error = e
+            if done is not None:
+                done.set()
+            data = item = None   # don't pin a shared-memory slot between frames
+        try:
+            self.proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def write(self, data, count=1, done=None):
+        """Queue data to be written count times; done (an Event) is set once it has been"""
+        if self.error:
+            raise RuntimeError(f"Encoder for {self.cmd[-1]} died: {self.error}")
+        self.queue.put((data, count, done))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        returncode = self.proc.wait()
+        if self.reader:
+            self.reader.join()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, self.cmd)
+
+    def abort(self):
+        self.proc.kill()
+        self.queue.put(None)
+        self.thread.join()
+        self.proc.wait()
+
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def open_encoders(scenes, outputs, ffmpeg_bin, audio_mix=(0.3, 0.7), output_args=None,
+                  progress=None, overlay_mode=None, threads=None):
+    """Start one Encoder per {profile_or_layout: output_path}.
+
+    Returns ({name: (layout_name, Encoder)}, ass_files, overlay_mode), with
+    overlay_mode resolved against what the FFmpeg build supports. An
+    output_path ending in .m3u8 is written as a growing HLS playlist
+    (see progressive.py).
+    """
+    total_frames = sum(scene["frames"] for scene in scenes)
+    duration_sec = total_frames / FPS
+    overlay_mode = overlay_mode or OVERLAY_MODE
+    if overlay_mode == "ass":
+        from ffmpeg_probe import probe
+        if not probe().get("ass"):
+            print("FFmpeg has no ass filter (libass); drawing overlay text with PIL")
+            overlay_mode = "pil"
+    if progress:
+        progress.start_render(total_frames, outputs, FPS)
+    encoders = {}
+    ass_files = {}
+    try:
+        for name, output in outputs.items():
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+            layout_name = output_layout(name)
+            canvas = LAYOUTS[layout_name]["size"]
+            if name in PROFILES:
+                args, vf = profile_output_args(name, FPS), scale_filter(name, canvas)
+            else:
+                args, vf = output_args, None
+            if output.endswith(".m3u8"):
+                from progressive import hls_args, puzzle_starts
+                args = hls_args(args or DEFAULT_OUTPUT_ARGS, output, puzzle_starts(scenes, FPS))
+            if overlay_mode == "ass":
+                from subtitles import ass_filter, write_ass
+                if layout_name not in ass_files:
+                    ass_path = f"{os.path.splitext(output)[0]}.{layout_name}.ass"
+                    ass_files[layout_name] = write_ass(scenes, layout_name, ass_path, FPS)
+                fonts_dir = os.path.dirname(os.path.abspath(FONT_PATH))
+                # Burn the text in at canvas size, then scale to the profile
+                vf = ",".join(f for f in (ass_filter(ass_files[layout_name], fonts_dir), vf) if f)
+            cmd = encoder_command(ffmpeg_bin, canvas, output, duration_sec, audio_mix, args, vf,
+                                  progress=progress is not None, threads=threads)
+            on_progress = (lambda info, name=name: progress.encoder_update(name, info)) \
+                if progress else None
+            encoders[name] = (layout_name, Encoder(cmd, on_progress=on_progress))
+    except BaseException:
+        abort_encoders(encoders, ass_files)
+        raise
+    return encoders, ass_files, overlay_mode
+
+
+def abort_encoders(encoders, ass_files):
+    for _, encoder in encoders.values():
+        encoder.abort()
+    _remove(ass_files.values())
+
+
+def close_encoders(encoders, ass_files):
+    """Wait for every encoder to finish; raises the first FFmpeg failure"""
+    errors = []
+    for _, encoder in encoders.values():
+        try:
+            encoder.close()
+        except subprocess.CalledProcessError as e:
+            errors.append(e)
+    _remove(ass_files.values())
+    if errors:
+        raise errors[0]
+
+
+def render_timeline(scenes, outputs, ffmpeg_bin, audio_mix=(0.3, 0.7), output_args=None,
+                    progress=None, overlay_mode=None, workers=None, threads=None):
+    """Render scenes into every {profile_or_layout: output_path} in a single pass.
+
+    Each layout is composited once per scene and shared by every output cut
+    from it. Returns the number of frames written to each output. A
+    progress.Progress, if given, receives frame and encoder updates.
+    overlay_mode overrides OVERLAY_MODE for this call. With workers > 1
+    (default RENDER_WORKERS) scenes are composited in worker processes and
+    handed over through shared memory (see frame_ring.py). threads is
+    passed to every FFmpeg encoder as -threads (see scheduler.py).
+    """
+    workers = workers or RENDER_WORKERS
+    if workers > 1:
+        from frame_ring import render_parallel
+        return render_parallel(scenes, outputs, ffmpeg_bin, workers, audio_mix, output_args,
+                               progress, overlay_mode, threads=threads)
+
+    encoders, ass_files, overlay_mode = open_encoders(
+        scenes, outputs, ffmpeg_bin, audio_mix, output_args, progress, overlay_mode, threads)
+    frame_count = 0
+    try:
+        for scene in scenes:
+            layer = None
+            if "card" not in scene:
+                layer = get_board_layer(scene["fen"], scene["last_move"])
+            frames = {}
+            for layout_name, encoder in encoders.values():
+                if layout_name not in frames:
+                    frames[layout_name] = compose_frame(
+                        layout_name, scene, layer, draw_text=overlay_mode != "ass").tobytes()
+                encoder.write(frames[layout_name], scene["frames"])
+            frame_count += scene["frames"]
+            if progress:
+                progress.frames_done(frame_count, scene)
+    except BaseException:
+        abort_encoders(encoders, ass_files)
+        raise
+
+    close_encoders(encoders, ass_files)
+    return frame_count
@@ -0,0 +1,195 @@
+"""CPU- and memory-aware concurrency for batch renders.
+
+Left alone, every libx264 process starts a thread per core and every
+render job wants cores of its own, so running a few jobs at once
+oversubscribes the box. A Scheduler splits the usable cores between the
+jobs allowed to run at the same time: each job gets a number of compositing
+processes (render_timeline's `workers`) and an explicit `-threads` for
+each of its encoders, and memory caps how many jobs may run at all and
+how many compositing processes each may start (every one holds its own
+board layer LRU).
+
+The number of concurrent jobs is then tuned from measured throughput
+(encoded frames per second across all jobs). Every ADJUST_JOBS finished
+jobs (at least one per running slot) the rate is recorded for the current
+limit and the limit moves to whichever neighbouring limit is unexplored or
+measured faster; it stays put once both neighbours are slower. The first
+window after a change is discarded, since it still holds jobs started
+under the old limit. A load average above OVERLOAD per core always steps
+it down.
+
+    scheduler = Scheduler()
+    with scheduler.job(outputs=3) as alloc:
+        frames = render_timeline(scenes, outputs, ffmpeg, workers=alloc.render_workers,
+                                 threads=alloc.ffmpeg_threads)
+        alloc.frames = frames * 3
+
+A job that has the machine to itself (main_marathon.py) takes its split
+from plan_single() instead.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from renderer import LAYER_CACHE_BYTES
+
+# --- CONFIGURATION ---
+RESERVE_CORES = 0.5                # left for the OS, the outbox worker, fetching
+RENDER_SHARE = 0.25                # share of a job's cores given to compositing
+ENCODER_MEM_BYTES = 350 * 2**20    # libx264 at 1080p with lookahead, plus FFmpeg buffers
+RENDER_BASE_BYTES = 100 * 2**20    # a compositing process: interpreter, PIL, frame buffers
+RENDER_MEM_BYTES = RENDER_BASE_BYTES + LAYER_CACHE_BYTES   # ... once its layer LRU is full
+MEMORY_SHARE = 0.8                 # of available memory the batch may plan for
+ADJUST_JOBS = 2                    # finished jobs between concurrency adjustments
+OVERLOAD = 1.25                    # load average per core that forces a step down
+
+
+def usable_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory():
+    """MemAvailable from /proc/meminfo, else total physical memory, else None"""
+    try:
+        with open("/proc/meminfo") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class Allocation:
+    """What one job may use; set frames before leaving Scheduler.job()"""
+
+    def __init__(self, render_workers, ffmpeg_threads):
+        self.render_workers = render_workers
+        self.ffmpeg_threads = ffmpeg_threads
+        self.frames = 0
+
+    def __repr__(self):
+        return (f"Allocation(render_workers={self.render_workers}, "
+                f"ffmpeg_threads={self.ffmpeg_threads})")
+
+
+class Scheduler:
+    def __init__(self, cores=None, mem_bytes=None, outputs_per_job=1, max_jobs=None):
+        self.cores = cores or usable_cores()
+        self.mem_bytes = mem_bytes if mem_bytes is not None else available_memory()
+        budget = max(1.0, self.cores - RESERVE_CORES)
+        self.budget = budget
+        self.max_jobs = max(1, min(max_jobs or int(budget), self.jobs_by_memory(outputs_per_job)))
+        self.limit = max(1, min(self.max_jobs, int(budget // 2) or 1))
+        self.running = 0
+        self.cond = threading.Condition()
+        self.history = []          # (limit, frames per second) per adjustment window
+        self.rates = {}            # limit -> smoothed frames per second
+        self.settling = False
+        self.window_start = time.perf_counter()
+        self.window_frames = 0
+        self.window_jobs = 0
+
+    def job_memory(self, outputs, concurrent):
+        """Bytes one of `concurrent` jobs needs: its encoders plus every render worker"""
+        workers = self.allocation(outputs, concurrent).render_workers
+        return outputs * ENCODER_MEM_BYTES + workers * RENDER_MEM_BYTES
+
+    def jobs_by_memory(self, outputs_per_job):
+        """Most concurrent jobs whose encoders and render workers fit in memory"""
+        if not self.mem_bytes:
+            return self.cores
+        usable = self.mem_bytes * MEMORY_SHARE
+        jobs = 1
+        while jobs < self.cores:
+            if (jobs + 1) * self.job_memory(outputs_per_job, jobs + 1) > usable:
+                break
+            jobs += 1
+        return jobs
+
+    def allocation(self, outputs, concurrent=None):
+        """Cores for one of `concurrent` jobs, split into workers and encoder threads"""
+        concurrent = max(1, concurrent or self.limit)
+        share = self.budget / concurrent
+        render_workers = max(1, int(round(share * RENDER_SHARE)))
+        if self.mem_bytes:
+            # Each worker holds a full layer LRU; don't start more than memory allows
+            spare = self.mem_bytes * MEMORY_SHARE / concurrent - outputs * ENCODER_MEM_BYTES
+            render_workers = max(1, min(render_workers, int(spare // RENDER_MEM_BYTES)))
+        ffmpeg_threads = max(1, int(round((share - render_workers) / max(1, outputs))))
+        return Allocation(render_workers, ffmpeg_threads)
+
+    @contextmanager
+    def job(self, outputs=1):
+        """Wait for a free slot, then yield this job's Allocation"""
+        with self.cond:
+            while self.running >= self.limit:
+                self.cond.wait()
+            self.running += 1
+            alloc = self.allocation(outputs)
+        try:
+            yield alloc
+        finally:
+            with self.cond:
+                self.running -= 1
+                self.window_frames += alloc.frames
+                self.window_jobs += 1
+                # A window spans at least one job per slot, so it covers whole job durations
+                if self.window_jobs >= max(ADJUST_JOBS, self.limit):
+                    self._adjust()
+                self.cond.notify_all()
+
+    def _adjust(self):
+        """Hill-climb the job limit on the throughput of the window just finished"""
+        now = time.perf_counter()
+        fps = self.window_frames / max(1e-6, now - self.window_start)
+        self.window_start, self.window_frames, self.window_jobs = now, 0, 0
+        if self.settling:
+            self.settling = False
+            return
+        self.history.append((self.limit, fps))
+        old = self.rates.get(self.limit)
+        if old is not None and fps < old * 0.8:
+            self.rates = {}   # the workload changed; measure the neighbours again
+        self.rates[self.limit] = fps if old is None else (old + fps) / 2
+
+        if _load_per_core(self.cores) > OVERLOAD:
+            new_limit = max(1, self.limit - 1)
+        else:
+            neighbours = [c for c in (self.limit + 1, self.limit - 1) if 1 <= c <= self.max_jobs]
+            faster = [c for c in neighbours if self.rates.get(c, 0) > self.rates[self.limit]]
+            unexplored = [c for c in neighbours if c not in self.rates]
+            if faster:
+                new_limit = max(faster, key=self.rates.get)
+            else:
+                new_limit = unexplored[0] if unexplored else self.limit
+        if new_limit != self.limit:
+            self.settling = True
+            print(f"[scheduler] {fps:.0f} frames/s at {self.limit} jobs; trying {new_limit}")
+            self.limit = new_limit
+
+    def report(self):
+        print(f"Scheduler: {self.cores} cores, {(self.mem_bytes or 0) / 2**30:.1f} GiB available, "
+              f"up to {self.max_jobs} jobs; now {self.limit} "
+              f"({self.allocation(1)} for a single-output job)")
+        for limit, fps in self.history:
+            print(f"  {limit} concurrent jobs: {fps:.0f} frames/s")
+
+
+def _load_per_core(cores):
+    try:
+        return os.getloadavg()[0] / cores
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def plan_single(outputs):
+    """Allocation for one job that has the whole machine (e.g. a marathon)"""
+    return Scheduler(outputs_per_job=outputs, max_jobs=1).allocation(outputs, concurrent=1)
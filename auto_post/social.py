@@ -0,0 +1,51 @@
+"""Captions and post targets shared by every script that queues posts.
+
+main.py, main_reels.py, render_daemon.py and pipeline.py all go through
+post_outputs(), so captions, hashtags and where each profile is posted
+are defined once here.
+"""
+import random
+
+from outbox import enqueue_post, start_worker
+from publish import public_url
+
+# --- CONFIGURATION ---
+PUZZLE_LINK = "https://roynek.com/Chess_Sol_Puzzles/public/?puzzle={id}"
+
+# Where each output profile is posted
+# area: 6=chessSol, 3=Nataya, 7=Roynek Technologies, 21=X chess community
+POST_TARGETS = {
+    "facebook_feed": {"platform": "facebook", "area": "6"},
+    "facebook_reels": {"platform": "facebook", "area": "6", "fb_post_to": "reels"},
+    "x": {"platform": "x", "area": "21", "x_comm_id": "1578034816620310528"},
+}
+
+MESSAGES = [
+    "Can you find the winning move? 🧩 ({side} to move)",
+    "Today's daily challenge — {side} to move!",
+    "Test your tactics ({rating}) — {side} to move!",
+    "What is the best move here? ({side} to play)",
+    "Spot the winning sequence! 🔥 ({side})"
+]
+HASHTAGS = ["#Chess", "#ChessPuzzles", "#Tactics", "#BrainTeaser"]
+
+
+def caption(data, side_to_move, mention=True):
+    """Random message plus three hashtags, ASCII only for the posting API"""
+    msg = random.choice(MESSAGES).format(rating=data['rating'], side=side_to_move)
+    tags = " ".join(random.sample(HASHTAGS, 3))
+    text = f" {msg} {tags} @followers " if mention else f" {msg} {tags}  "
+    return text.encode("ascii", "ignore").decode()
+
+
+def post_outputs(data, side_to_move, outputs, mention=True):
+    """Queue a post for every {profile: path} that has a POST_TARGETS entry"""
+    text = caption(data, side_to_move, mention)
+    for profile, path in outputs.items():
+        target = POST_TARGETS.get(profile)
+        if not target:
+            continue
+        enqueue_post(link=PUZZLE_LINK.format(id=data['id']), text=text,
+                     media=public_url(path), **target)
+    # Posting happens in a detached worker so the caller can exit now
+    start_worker()
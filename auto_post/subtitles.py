@@ -0,0 +1,115 @@
+"""Scene overlays as an ASS subtitle track for FFmpeg to burn in.
+
+In overlay_mode="ass" render_timeline() only draws the board on each
+frame and passes this track to FFmpeg's `ass` filter (libass), with the
+bundled Roboto supplied through fontsdir so nothing depends on system
+fonts. Text placement comes from renderer.overlay_items(), the same code
+compose_frame() draws with, and consecutive scenes showing the same line
+are merged into one event, so a 60-puzzle marathon is a few hundred
+events rather than a text draw on every frame.
+"""
+import os
+
+# --- CONFIGURATION ---
+STYLE_NAME = "Overlay"
+
+
+# --- UTILITY FUNCTIONS ---
+def ass_time(seconds):
+    """0:00:01.50 style timestamp (centiseconds)"""
+    cs = int(round(seconds * 100))
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+
+def ass_colour(colour):
+    """PIL colour name or RGB tuple -> ASS &HBBGGRR&"""
+    from PIL import ImageColor
+
+    r, g, b = ImageColor.getrgb(colour)[:3] if isinstance(colour, str) else colour[:3]
+    return f"&H{b:02X}{g:02X}{r:02X}&"
+
+
+def ass_text(text):
+    # Braces start override blocks and backslashes escapes; neither is
+    # escapable in ASS, so they are swapped for look-alikes
+    return text.replace("\\", "/").replace("{", "(").replace("}", ")").replace("\n", " ")
+
+
+def filter_path(path):
+    """A path quoted for use as an FFmpeg filter option value"""
+    path = os.path.abspath(path)
+    if "'" in path:
+        raise ValueError(f"Cannot pass {path!r} to an FFmpeg filter")
+    return "'" + path.replace(":", "\\:") + "'"
+
+
+def ass_filter(ass_path, fonts_dir):
+    return f"ass=filename={filter_path(ass_path)}:fontsdir={filter_path(fonts_dir)}"
+
+
+# --- TRACK BUILDING ---
+def _event(start, end, item, font_sizes):
+    text, px, colour, (x, y), centered = item
+    align = 5 if centered else 7
+    return (f"Dialogue: 0,{ass_time(start)},{ass_time(end)},{STYLE_NAME},,0,0,0,,"
+            f"{{\\an{align}\\pos({x},{y})\\fs{font_sizes(px)}\\c{ass_colour(colour)}}}"
+            f"{ass_text(text)}")
+
+
+def build_ass(scenes, layout_name, fps):
+    """Full ASS script for a timeline on one layout"""
+    from PIL import Image, ImageDraw
+    from renderer import LAYOUTS, get_font, overlay_items
+
+    cw, ch = LAYOUTS[layout_name]["size"]
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    family = get_font(36).getname()[0]
+
+    # libass sizes a font by its full line height, PIL by its em size
+    sizes = {}
+
+    def font_sizes(px):
+        if px not in sizes:
+            sizes[px] = sum(get_font(px).getmetrics())
+        return sizes[px]
+
+    events = []
+    open_items = {}   # item -> first frame it was shown
+    frame = 0
+    for scene in scenes:
+        current = set(overlay_items(layout_name, scene, draw))
+        for item in [i for i in open_items if i not in current]:
+            events.append((open_items.pop(item), frame, item))
+        for item in current:
+            open_items.setdefault(item, frame)
+        frame += scene["frames"]
+    for item, start in open_items.items():
+        events.append((start, frame, item))
+    events.sort(key=lambda e: (e[0], e[2][3][1], e[2][3][0]))
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {cw}",
+        f"PlayResY: {ch}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: {STYLE_NAME},{family},36,&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,"
+        "0,0,0,0,100,100,0,0,1,0,0,7,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    lines += [_event(start / fps, end / fps, item, font_sizes) for start, end, item in events]
+    return "\n".join(lines) + "\n"
+
+
+def write_ass(scenes, layout_name, path, fps):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(build_ass(scenes, layout_name, fps))
+    return path
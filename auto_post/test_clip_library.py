@@ -0,0 +1,66 @@
+"""Marathon clip selection against a manifest written the way main.py writes it.
+
+Run from auto_post/:  python -m unittest test_clip_library
+"""
+import os
+import tempfile
+import unittest
+
+import clip_library
+from clip_library import record_clip, select_clips
+
+# Same profiles main.py and main_marathon.py use
+SHORT_OUTPUTS = ("facebook_feed", "x")
+MARATHON_OUTPUTS = ("facebook_feed", "youtube")
+
+
+class SelectClipsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        manifest = os.path.join(self.tmp.name, "clips.jsonl")
+        self.addCleanup(setattr, clip_library, "CLIP_MANIFEST", clip_library.CLIP_MANIFEST)
+        clip_library.CLIP_MANIFEST = manifest
+
+    def publish_short(self, puzzle_id, outputs=SHORT_OUTPUTS):
+        """What main.py does after publishing: one record per output"""
+        data = {"id": puzzle_id, "rating": 1500, "themes": ["fork"]}
+        for name in outputs:
+            path = os.path.join(self.tmp.name, f"{puzzle_id}_{name}.mp4")
+            open(path, "wb").close()
+            record_clip(data, name, path, 21.5)
+
+    def test_daily_shorts_are_selected_for_marathon(self):
+        self.publish_short("aaaaa")
+        self.publish_short("bbbbb")
+        puzzles = select_clips(list(MARATHON_OUTPUTS), 5)
+        self.assertEqual(len(puzzles), 2)
+        for clips in puzzles:
+            self.assertEqual(set(clips), set(MARATHON_OUTPUTS))
+            self.assertNotIn("borrowed_from", clips["facebook_feed"])
+
+    def test_youtube_borrows_facebook_feed_clip(self):
+        self.publish_short("aaaaa")
+        clips = select_clips(list(MARATHON_OUTPUTS), 5)[0]
+        self.assertEqual(clips["youtube"]["borrowed_from"], "facebook_feed")
+        self.assertEqual(clips["youtube"]["path"], clips["facebook_feed"]["path"])
+
+    def test_own_youtube_clip_wins_over_borrowed(self):
+        self.publish_short("aaaaa", SHORT_OUTPUTS + ("youtube",))
+        clips = select_clips(list(MARATHON_OUTPUTS), 5)[0]
+        self.assertNotIn("borrowed_from", clips["youtube"])
+        self.assertTrue(clips["youtube"]["path"].endswith("_youtube.mp4"))
+
+    def test_profile_without_fallback_is_still_required(self):
+        self.publish_short("aaaaa")
+        self.assertEqual(select_clips(["facebook_feed", "facebook_reels"], 5), [])
+
+    def test_missing_files_are_skipped(self):
+        self.publish_short("aaaaa")
+        os.remove(os.path.join(self.tmp.name, "aaaaa_facebook_feed.mp4"))
+        self.assertEqual(select_clips(list(MARATHON_OUTPUTS), 5), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
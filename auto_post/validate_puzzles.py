@@ -0,0 +1,198 @@
+"""Validate puzzle data in bulk and annotate it for the renderers.
+
+Every solution is replayed with python-chess across all CPU cores: the
+FEN must parse and be a legal position, every UCI move must be legal in
+turn, and the line must have at least MIN_MOVES moves (setup move plus a
+reply). Failures, including CSV rows that don't parse and repeated
+PuzzleIds, go to FAILURE_REPORT in the same {"error", "row"} shape as
+the import reports; valid puzzles are written to VALID_OUTPUT with their
+render features (move count, video duration, piece count, solver side).
+
+    python validate_puzzles.py puzzles_db/*.csv
+    python validate_puzzles.py puzzle_pool.npz
+
+puzzle_source.py runs the same check on everything it fetches, and
+`puzzle_pool.py build --exclude reports/validation_failures.jsonl` keeps
+known-bad rows out of the local pool.
+"""
+import os
+import csv
+import sys
+import json
+import glob
+import time
+import argparse
+
+# --- CONFIGURATION ---
+FAILURE_REPORT = "reports/validation_failures.jsonl"
+VALID_OUTPUT = "reports/validated_puzzles.jsonl"
+MIN_MOVES = 2
+CHUNK_SIZE = 256        # puzzles handed to a worker at a time
+READ_ERROR = "_read_error"   # marks rows the readers rejected, see _check()
+DUPLICATE = "Duplicate PuzzleId"
+
+
+# --- VALIDATION ---
+def validate_puzzle(puzzle):
+    """Replay a puzzle's solution; returns (features, None) or (None, error)"""
+    import chess
+    from renderer import puzzle_duration
+
+    try:
+        board = chess.Board(puzzle['fen'])
+    except (KeyError, ValueError) as e:
+        return None, f"Bad FEN: {e}"
+    if not board.is_valid():
+        return None, f"Illegal position: {board.status()!r}"
+
+    moves = puzzle.get('moves') or []
+    if isinstance(moves, str):
+        moves = moves.split()
+    if len(moves) < MIN_MOVES:
+        return None, f"Too short: {len(moves)} moves"
+
+    pieces = len(board.piece_map())
+    solver = "Black" if board.turn == chess.WHITE else "White"
+    for ply, uci in enumerate(moves, 1):
+        try:
+            move = chess.Move.from_uci(uci)
+        except ValueError:
+            return None, f"Malformed move {uci!r} at ply {ply}"
+        if move not in board.legal_moves:
+            return None, f"Illegal move {uci} at ply {ply}"
+        board.push(move)
+
+    return {
+        "n_moves": len(moves),
+        "duration_sec": puzzle_duration(len(moves)),
+        "pieces": pieces,
+        "solver_side": solver,
+        "ends_in_mate": board.is_checkmate(),
+    }, None
+
+
+def _check(puzzle):
+    if READ_ERROR in puzzle:
+        return puzzle["row"], None, puzzle[READ_ERROR]
+    features, error = validate_puzzle(puzzle)
+    return puzzle, features, error
+
+
+# --- INPUT ---
+def _from_csv(path):
+    """Lichess CSV rows in the /api/puzzles result shape"""
+    with open(path, newline="", encoding="utf-8") as fh:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            try:
+                yield {
+                    "id": (row.get("PuzzleId") or "").strip(),
+                    "fen": (row.get("FEN") or "").strip(),
+                    "moves": (row.get("Moves") or "").strip(),
+                    "rating": int(row.get("Rating") or 0),
+                    "themes": row.get("Themes") or "",
+                    "popularity": int(row.get("Popularity") or 0),
+                    "plays": int(row.get("NbPlays") or 0),
+                    "opening": row.get("OpeningTags") or "",
+                }
+            except ValueError as e:
+                yield {READ_ERROR: f"Bad row at {path}:{reader.line_num}: {e}", "row": row}
+
+
+def _from_jsonl(path):
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _from_pool(path):
+    from puzzle_pool import PuzzlePool
+
+    pool = PuzzlePool.load(path)
+    for idx in range(len(pool)):
+        yield pool.puzzle(idx)
+
+
+def read_puzzles(paths):
+    """Puzzles from every input; a PuzzleId seen before is passed on as a failure"""
+    readers = {".csv": _from_csv, ".jsonl": _from_jsonl, ".npz": _from_pool}
+    seen = {}
+    for path in paths:
+        reader = readers.get(os.path.splitext(path)[1])
+        if reader is None:
+            print(f"Skipping {path}: unknown format")
+            continue
+        for puzzle in reader(path):
+            puzzle_id = puzzle.get("id")
+            if puzzle_id and READ_ERROR not in puzzle:
+                if puzzle_id in seen:
+                    error = f"{DUPLICATE} {puzzle_id} (first in {seen[puzzle_id]})"
+                    puzzle = {READ_ERROR: error, "row": puzzle}
+                else:
+                    seen[puzzle_id] = path
+            yield puzzle
+
+
+# --- MAIN SCRIPT ---
+def validate_files(paths, valid_output=VALID_OUTPUT, failure_report=FAILURE_REPORT,
+                   workers=None):
+    """Stream puzzles through a process pool; returns (valid, failed) counts"""
+    from multiprocessing import Pool
+
+    for path in (valid_output, failure_report):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    valid = failed = 0
+    start = time.perf_counter()
+    with open(valid_output, "w", encoding="utf-8") as ok_fh, \
+            open(failure_report, "w", encoding="utf-8") as bad_fh, \
+            Pool(workers or os.cpu_count()) as pool:
+        for puzzle, features, error in pool.imap(_check, read_puzzles(paths), CHUNK_SIZE):
+            if error:
+                bad_fh.write(json.dumps({"error": error, "row": puzzle}) + "\n")
+                failed += 1
+            else:
+                ok_fh.write(json.dumps(dict(puzzle, **features)) + "\n")
+                valid += 1
+            if (valid + failed) % 100000 == 0:
+                print(f"  {valid + failed} checked, {failed} failed")
+
+    elapsed = time.perf_counter() - start
+    rate = (valid + failed) / elapsed if elapsed else 0
+    print(f"{valid} valid, {failed} failed in {elapsed:.1f}s ({rate:.0f} puzzles/s)")
+    return valid, failed
+
+
+def failed_ids(failure_report=FAILURE_REPORT):
+    """Puzzle IDs listed in a failure report.
+
+    Duplicates are left out: their first copy may be perfectly valid.
+    """
+    ids = set()
+    for record in _from_jsonl(failure_report):
+        if record.get("error", "").startswith(DUPLICATE):
+            continue
+        row = record.get("row") or {}
+        puzzle_id = row.get("id") or row.get("PuzzleId")
+        if puzzle_id:
+            ids.add(puzzle_id)
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and annotate puzzle data")
+    parser.add_argument("inputs", nargs="+", help="CSV, JSONL or puzzle_pool .npz files")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--valid-output", default=VALID_OUTPUT)
+    parser.add_argument("--failure-report", default=FAILURE_REPORT)
+    args = parser.parse_args()
+
+    paths = [p for pattern in args.inputs for p in sorted(glob.glob(pattern))]
+    if not paths:
+        sys.exit("No input files matched")
+    validate_files(paths, args.valid_output, args.failure_report, args.workers)
+
+
+if __name__ == "__main__":
+    main()
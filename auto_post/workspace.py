@@ -0,0 +1,150 @@
+"""Per-job scratch workspaces so several renders can run side by side.
+
+Each job gets its own directory (on tmpfs when it has room), encodes its
+outputs there and moves them to their published name in output_video/
+when done (content-addressed, see publish.py). Workspaces left behind by
+crashed jobs (owner pid dead) are removed the next time any job starts.
+A workspace whose owner is still running is never touched automatically;
+to clear out hung jobs, opt in explicitly:
+
+    python workspace.py --force-older-than 6
+
+    with Workspace("short", estimate_bytes=50e6) as ws:
+        scratch = ws.path("facebook_feed.mp4")
+        ...
+        final = publish.publish_output(ws, scratch, "output_video/chess_short.mp4", puzzle_id)
+"""
+import os
+import json
+import argparse
+import time
+import uuid
+import shutil
+
+# --- CONFIGURATION ---
+# Tried in order; the first with enough free space for the job is used
+WORK_ROOTS = ["/dev/shm/chess_sol_work", "work"]
+ORPHAN_AFTER_SEC = 3600   # a workspace with no owner file is reaped after this
+DISK_RESERVE_BYTES = 512 * 1024 * 1024   # never fill a filesystem past this
+OWNER_FILE = ".owner"
+
+
+# --- UTILITY FUNCTIONS ---
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_stale(root, force_older_than=None):
+    """Remove workspaces whose owner process is gone.
+
+    Workspaces of live owners are kept unless force_older_than (seconds) is
+    given and they are older than that; callers must opt in to that.
+    """
+    if not os.path.isdir(root):
+        return
+    now = time.time()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            with open(os.path.join(path, OWNER_FILE)) as fh:
+                owner = json.load(fh)
+        except (OSError, ValueError):
+            # Half-created workspace: only reap it once it is clearly old
+            try:
+                if now - os.path.getmtime(path) < ORPHAN_AFTER_SEC:
+                    continue
+            except OSError:
+                continue
+            owner = {"pid": -1, "created": 0}
+        if _pid_alive(owner["pid"]):
+            if force_older_than is None or now - owner["created"] < force_older_than:
+                continue
+            print(f"Forcing removal of workspace {path} (pid {owner['pid']} still alive)")
+        else:
+            print(f"Removing stale workspace {path}")
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def free_bytes(path):
+    probe = path
+    while not os.path.exists(probe):
+        probe = os.path.dirname(probe) or "."
+    return shutil.disk_usage(probe).free
+
+
+def check_disk(path, needed_bytes):
+    """Raise if writing needed_bytes under path would eat into the reserve"""
+    free = free_bytes(path)
+    if free - needed_bytes < DISK_RESERVE_BYTES:
+        raise RuntimeError(
+            f"Not enough disk for {path}: need {needed_bytes / 1e6:.0f} MB "
+            f"+ {DISK_RESERVE_BYTES / 1e6:.0f} MB reserve, {free / 1e6:.0f} MB free"
+        )
+
+
+class Workspace:
+    """A unique scratch directory that is removed when the job ends"""
+
+    def __init__(self, kind="job", estimate_bytes=0, roots=None):
+        self.kind = kind
+        self.estimate_bytes = int(estimate_bytes)
+        self.roots = roots or WORK_ROOTS
+        self.job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.dir = None
+
+    def __enter__(self):
+        for root in self.roots:
+            cleanup_stale(root)
+        for root in self.roots:
+            try:
+                os.makedirs(root, exist_ok=True)
+                check_disk(root, self.estimate_bytes)
+            except (OSError, RuntimeError) as e:
+                print(f"Workspace root {root} unusable: {e}")
+                continue
+            self.dir = os.path.join(root, f"{self.kind}-{self.job_id}")
+            os.makedirs(self.dir)
+            with open(os.path.join(self.dir, OWNER_FILE), "w") as fh:
+                json.dump({"pid": os.getpid(), "created": time.time(), "kind": self.kind}, fh)
+            return self
+        raise RuntimeError(f"No workspace root has {self.estimate_bytes / 1e6:.0f} MB free")
+
+    def __exit__(self, *exc):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        return False
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def publish(self, src, dst):
+        """Move a finished file out of the workspace; atomic on the target side"""
+        dst_dir = os.path.dirname(dst) or "."
+        os.makedirs(dst_dir, exist_ok=True)
+        if os.stat(src).st_dev != os.stat(dst_dir).st_dev:
+            check_disk(dst, os.path.getsize(src))
+        # Private .part name: two jobs publishing the same target must not share it
+        part = f"{dst}.{self.job_id}.part"
+        shutil.move(src, part)   # copies when the workspace is on tmpfs
+        os.replace(part, dst)
+        return dst
+
+
+# --- MAIN SCRIPT ---
+def main():
+    parser = argparse.ArgumentParser(description="Remove workspaces left behind by dead jobs")
+    parser.add_argument("--force-older-than", type=float, metavar="HOURS",
+                        help="also remove workspaces of live jobs older than this")
+    args = parser.parse_args()
+    force = args.force_older_than * 3600 if args.force_older_than is not None else None
+    for root in WORK_ROOTS:
+        cleanup_stale(root, force)
+
+
+if __name__ == "__main__":
+    main()